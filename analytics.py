@@ -0,0 +1,229 @@
+# Cube doanh thu dạng cột trong bộ nhớ: doanh thu / số lượng theo chiều bất kỳ, không join lại các bảng
+#
+# Mỗi dòng OrderDetails là một dòng fact, lưu thành các mảng NumPy:
+# - chiều mã hóa từ điển (int32): product, category, supplier, customer, country, employee;
+#   giá trị gốc nằm trong danh sách values của chiều, mảng chỉ giữ mã (vị trí trong danh sách)
+# - thời gian: day (số ngày từ 1970-01-01) và month (số tháng từ 1970-01), year suy ra từ month
+# - số đo: revenue (UnitPrice * Quantity * (1 - Discount), float64), quantity (int32)
+# CategoryID, SupplierID và Country được chụp lúc nạp dòng (giá trị tại thời điểm bán).
+#
+# Nạp toàn bộ một lần, sau đó chỉ thêm hóa đơn mới: ngay khi ghi (main.save_orders) và định kỳ theo
+# mốc OrderID (hóa đơn do worker khác ghi). Truy vấn: lọc bằng mặt nạ, gom nhóm bằng np.bincount.
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+from main.incremental import IncrementalHolder, IncrementalOrders
+
+LOAD_BATCH_SIZE = 100000
+# Số nhóm tối đa (tích số giá trị các chiều) gom bằng mảng đặc; lớn hơn thì dùng np.unique
+DENSE_GROUPS_LIMIT = 10_000_000
+
+EPOCH = date(1970, 1, 1)
+DICTIONARY_DIMENSIONS = {
+    # chiều: (tên trường trong kết quả, vị trí trong dòng của crud.sales_facts_query)
+    "product": ("ProductID", 2),
+    "category": ("CategoryID", 3),
+    "supplier": ("SupplierID", 4),
+    "customer": ("CustomerID", 5),
+    "country": ("Country", 6),
+    "employee": ("EmployeeID", 7),
+}
+TIME_DIMENSIONS = ("year", "month", "date")
+DIMENSIONS = TIME_DIMENSIONS + tuple(DICTIONARY_DIMENSIONS)
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+class Dictionary:
+    # Giá trị <-> mã của một chiều; chỉ thêm, không xóa (mã cũ luôn hợp lệ)
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+        self._text_codes = {}
+
+    def encode(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+            self._text_codes["" if value is None else str(value)] = code
+        return code
+
+    def encode_all(self, values, out):
+        # Mã hóa cả cột: thêm các giá trị mới (ít) trước, sau đó tra từ điển bằng map (không gọi hàm Python mỗi dòng)
+        for value in set(values).difference(self._codes):
+            self.encode(value)
+        out[:] = np.fromiter(map(self._codes.__getitem__, values), dtype=np.int32, count=len(values))
+
+    def lookup(self, text: str) -> int:
+        # Giá trị lọc từ query string; không có thì -1 (không khớp dòng nào)
+        return self._text_codes.get(text, -1)
+
+
+class SalesCube(IncrementalOrders):
+    load_batch_size = LOAD_BATCH_SIZE
+
+    def __init__(self, capacity: int = 1024):
+        super().__init__()
+        self.dictionaries = {name: Dictionary() for name in DICTIONARY_DIMENSIONS}
+        self.size = 0
+        self.columns = self._allocate(capacity)
+        self._append_lock = threading.Lock()
+
+    def _allocate(self, capacity: int):
+        columns = {name: np.zeros(capacity, dtype=np.int32) for name in DICTIONARY_DIMENSIONS}
+        columns["day"] = np.zeros(capacity, dtype=np.int32)
+        columns["month"] = np.zeros(capacity, dtype=np.int32)
+        columns["quantity"] = np.zeros(capacity, dtype=np.int32)
+        columns["revenue"] = np.zeros(capacity, dtype=np.float64)
+        return columns
+
+    def apply(self, rows):
+        # rows: các dòng của crud.sales_facts_query; hóa đơn đã có trong cube được bỏ qua
+        with self._append_lock:
+            rows = [row for row in rows if not self.is_loaded(row[0])]
+            if not rows:
+                return 0
+            count, size = len(rows), self.size
+            columns = self.columns
+            if size + count > len(columns["revenue"]):
+                # Mảng mới gấp đôi; request đang đọc vẫn giữ mảng cũ
+                grown = self._allocate(max(2 * len(columns["revenue"]), size + count))
+                for name, column in columns.items():
+                    grown[name][:size] = column[:size]
+                columns = grown
+
+            fields = list(zip(*rows))
+            for name, (_, position) in DICTIONARY_DIMENSIONS.items():
+                self.dictionaries[name].encode_all(fields[position], columns[name][size:size + count])
+            # Số ngày phân biệt ít: đổi từng ngày một lần rồi tra từ điển
+            day_numbers = {day: (day - EPOCH).days for day in set(fields[1])}
+            days = np.fromiter(map(day_numbers.__getitem__, fields[1]), dtype=np.int64, count=count)
+            columns["day"][size:size + count] = days
+            columns["month"][size:size + count] = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+            quantity = np.array(fields[9], dtype=np.float64)
+            price = np.array(fields[8], dtype=np.float64)
+            discount = np.array(fields[10], dtype=np.float64)
+            # NULL thành NaN; SUM trong SQL bỏ qua NULL nên ở đây tính là 0
+            columns["quantity"][size:size + count] = np.nan_to_num(quantity)
+            columns["revenue"][size:size + count] = np.nan_to_num(price * quantity * (1 - discount))
+
+            # Gán mảng trước rồi mới tăng size: request đọc song song không thấy dòng chưa ghi xong
+            self.columns = columns
+            self.size = size + count
+            self.mark_loaded({row[0] for row in rows})
+            return count
+
+    def _keys(self, columns, dimension: str):
+        # Khóa nguyên của chiều trên từng dòng: mã từ điển, hoặc số năm / tháng / ngày tính từ 1970
+        if dimension == "year":
+            return columns["month"] // 12
+        if dimension == "month":
+            return columns["month"]
+        if dimension == "date":
+            return columns["day"]
+        return columns[dimension]
+
+    def _parse(self, dimension: str, text: str) -> int:
+        try:
+            if dimension == "year":
+                return int(text) - 1970
+            if dimension == "month":
+                year, month = (int(part) for part in text.split("-"))
+                if not 1 <= month <= 12:
+                    raise ValueError(text)
+                return (year - 1970) * 12 + month - 1
+            if dimension == "date":
+                return (date.fromisoformat(text) - EPOCH).days
+        except ValueError:
+            raise InvalidQuery(f"Invalid {dimension} value: {text}")
+        return self.dictionaries[dimension].lookup(text)
+
+    def _decode(self, dimension: str, key: int):
+        if dimension == "year":
+            return {"Year": key + 1970}
+        if dimension == "month":
+            return {"Year": key // 12 + 1970, "Month": key % 12 + 1}
+        if dimension == "date":
+            return {"OrderDate": EPOCH + timedelta(days=key)}
+        field, _ = DICTIONARY_DIMENSIONS[dimension]
+        return {field: self.dictionaries[dimension].values[key]}
+
+    def revenue(self, group_by=(), filters=None, start_date: date = None, end_date: date = None):
+        # group_by: danh sách chiều; filters: {chiều: [giá trị dạng chuỗi]}
+        for dimension in list(group_by) + list(filters or {}):
+            if dimension not in DIMENSIONS:
+                raise InvalidQuery(f"Unknown dimension: {dimension}. Allowed values: {', '.join(DIMENSIONS)}")
+        size, columns = self.size, self.columns
+        columns = {name: column[:size] for name, column in columns.items()}
+
+        mask = None
+        for dimension, values in (filters or {}).items():
+            keys = [self._parse(dimension, value) for value in values]
+            selected = np.isin(self._keys(columns, dimension), keys)
+            mask = selected if mask is None else mask & selected
+        if start_date is not None:
+            selected = columns["day"] >= (start_date - EPOCH).days
+            mask = selected if mask is None else mask & selected
+        if end_date is not None:
+            selected = columns["day"] <= (end_date - EPOCH).days
+            mask = selected if mask is None else mask & selected
+
+        def rows(column):
+            # Chỉ lọc các cột được dùng
+            return column if mask is None else column[mask]
+
+        revenue, quantity = rows(columns["revenue"]), rows(columns["quantity"])
+        if not group_by:
+            return [{"Revenue": float(revenue.sum()), "Quantity": int(quantity.sum()), "Lines": int(len(revenue))}]
+        if not len(revenue):
+            return []
+
+        # Khóa nhóm = chỉ số phẳng của các khóa chiều (đã trừ giá trị nhỏ nhất) trong lưới nhóm
+        offsets, shape, keys = [], [], []
+        for dimension in group_by:
+            key = rows(self._keys(columns, dimension)).astype(np.int64)
+            low = int(key.min())
+            offsets.append(low)
+            shape.append(int(key.max()) - low + 1)
+            keys.append(key - low)
+        total = np.prod(shape, dtype=np.float64)
+        if total >= 2 ** 62:
+            raise InvalidQuery("Too many groups; group by fewer dimensions or add filters")
+        total = int(total)
+        flat = np.ravel_multi_index(keys, shape)
+        if total <= DENSE_GROUPS_LIMIT:
+            lines = np.bincount(flat, minlength=total)
+            groups = np.flatnonzero(lines)
+            lines = lines[groups]
+            sums = np.bincount(flat, weights=revenue, minlength=total)[groups]
+            quantities = np.bincount(flat, weights=quantity, minlength=total)[groups]
+        else:
+            groups, inverse, lines = np.unique(flat, return_inverse=True, return_counts=True)
+            sums = np.bincount(inverse, weights=revenue)
+            quantities = np.bincount(inverse, weights=quantity)
+
+        result = []
+        for index, group_keys in enumerate(zip(*np.unravel_index(groups, shape))):
+            row = {}
+            for dimension, low, key in zip(group_by, offsets, group_keys):
+                row.update(self._decode(dimension, int(key) + low))
+            row.update({"Revenue": float(sums[index]), "Quantity": int(quantities[index]),
+                        "Lines": int(lines[index])})
+            result.append(row)
+        return result
+
+    def stats(self):
+        return {
+            "rows": self.size,
+            "last_order_id": self.last_order_id,
+            "bytes": int(sum(column[:self.size].nbytes for column in self.columns.values())),
+            "dimensions": {name: len(dictionary.values) for name, dictionary in self.dictionaries.items()},
+        }
+
+
+holder = IncrementalHolder(SalesCube, "sales-cube")
@@ -0,0 +1,116 @@
+# Xuất kết quả truy vấn dạng Arrow IPC (stream) hoặc Parquet từ server-side cursor
+#
+# Kiểu cột Arrow suy ra từ kiểu cột SQLAlchemy: Numeric(19, 4) -> decimal128(19, 4), Float -> float64,
+# Date -> date32, String -> string..., nên bên nhận (pandas, polars, DuckDB, Spark) có đúng kiểu mà không
+# phải đoán lại từ JSON. Mỗi lô yield_per dòng thành một record batch (Arrow) / row group (Parquet),
+# được ghi ra và gửi đi ngay: bộ nhớ chỉ giữ một lô, không phụ thuộc tổng số dòng.
+# Cần pyarrow; main.py chỉ import module này khi có request xuất dữ liệu.
+import io
+from enum import Enum
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi.responses import StreamingResponse
+from sqlalchemy import types
+
+ARROW_BATCH_SIZE = 65536
+PARQUET_COMPRESSION = "zstd"
+
+
+class ExportFormat(str, Enum):
+    arrow = "arrow"
+    parquet = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.arrow: "application/vnd.apache.arrow.stream",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+EXTENSIONS = {
+    ExportFormat.arrow: "arrows",
+    ExportFormat.parquet: "parquet",
+}
+
+
+def arrow_type(sql_type):
+    # Thứ tự kiểm tra quan trọng: Float là lớp con của Numeric, DateTime không phải Date
+    if isinstance(sql_type, types.Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, types.BigInteger):
+        return pa.int64()
+    if isinstance(sql_type, types.SmallInteger):
+        return pa.int16()
+    if isinstance(sql_type, types.Integer):
+        return pa.int32()
+    if isinstance(sql_type, types.Float):
+        return pa.float64()
+    if isinstance(sql_type, types.Numeric):
+        if sql_type.precision is None:
+            return pa.float64()
+        return pa.decimal128(sql_type.precision, sql_type.scale or 0)
+    if isinstance(sql_type, types.DateTime):
+        return pa.timestamp("us")
+    if isinstance(sql_type, types.Date):
+        return pa.date32()
+    if isinstance(sql_type, types.LargeBinary):
+        return pa.binary()
+    return pa.string()
+
+
+def arrow_schema(query):
+    return pa.schema([pa.field(column.name, arrow_type(column.type)) for column in query.selected_columns])
+
+
+class _Sink(io.RawIOBase):
+    # File chỉ ghi cho writer của pyarrow; drain() lấy phần đã ghi để gửi đi và làm rỗng bộ đệm
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+async def stream_arrow(session_factory, query, fmt: ExportFormat = ExportFormat.arrow,
+                       batch_size: int = ARROW_BATCH_SIZE):
+    schema = arrow_schema(query)
+    sink = _Sink()
+    if fmt == ExportFormat.parquet:
+        writer = pq.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        # Session riêng cho generator: nó còn chạy sau khi handler đã trả về
+        async with session_factory() as db:
+            result = await db.stream(query.execution_options(yield_per=batch_size))
+            async for rows in result.partitions(batch_size):
+                values = list(zip(*rows))
+                batch = pa.record_batch([pa.array(column, type=field.type) for column, field in zip(values, schema)],
+                                        schema=schema)
+                writer.write_batch(batch)
+                data = sink.drain()
+                if data:
+                    yield data
+    finally:
+        # Kể cả khi không có dòng nào: file vẫn hợp lệ (schema + footer / end-of-stream)
+        writer.close()
+    yield sink.drain()
+
+
+def export_response(session_factory, query, fmt: ExportFormat = ExportFormat.arrow, filename: str = "export"):
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{EXTENSIONS[fmt]}"'}
+    return StreamingResponse(stream_arrow(session_factory, query, fmt), media_type=MEDIA_TYPES[fmt],
+                             headers=headers)
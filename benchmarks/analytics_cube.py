@@ -0,0 +1,118 @@
+# So sánh cube doanh thu trong bộ nhớ (analytics.py) với truy vấn SQL join + GROUP BY tương ứng
+#
+#   python -m main.benchmarks.northwind_data --details 20000000 --reset
+#   python -m main.benchmarks.analytics_cube [--runs 3] [--skip-sql]
+#
+# Đo thời gian nạp cube, bộ nhớ và thời gian (trung vị, ms) từng truy vấn theo cả hai cách trên CSDL
+# trong DATABASE_URL; kiểm tra hai cách cho cùng kết quả. Kết quả in ra dạng JSON.
+import argparse
+import json
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy import and_, extract, func, select
+
+from main import analytics, crud, model, rollup
+
+SQL_DIMENSIONS = {
+    "year": [extract("year", model.Orders.OrderDate).label("Year")],
+    "month": [extract("year", model.Orders.OrderDate).label("Year"),
+              extract("month", model.Orders.OrderDate).label("Month")],
+    "date": [model.Orders.OrderDate],
+    "product": [model.OrderDetails.ProductID],
+    "category": [model.Product.CategoryID],
+    "supplier": [model.Product.SupplierID],
+    "customer": [model.Orders.CustomerID],
+    "country": [model.Customer.Country],
+    "employee": [model.Orders.EmployeeID],
+}
+
+# (group_by, filters, start_date, end_date)
+QUERIES = [
+    (["year"], {}, None, None),
+    (["category", "year"], {}, None, None),
+    (["country"], {}, None, None),
+    (["supplier", "month"], {}, None, None),
+    (["employee", "year"], {"country": ["Germany"]}, None, None),
+    (["customer"], {"category": ["1", "2"]}, None, None),
+    (["product"], {}, "1998-01-01", "1998-12-31"),
+]
+
+
+def sql_query(group_by, filters, start_date, end_date):
+    columns = [column for dimension in group_by for column in SQL_DIMENSIONS[dimension]]
+    conditions = [model.Orders.OrderDate.isnot(None)]
+    for dimension, values in filters.items():
+        column = SQL_DIMENSIONS[dimension][0]
+        conditions.append(column.in_([int(value) if dimension in ("category", "supplier", "product", "employee")
+                                      else value for value in values]))
+    if start_date:
+        conditions.append(model.Orders.OrderDate >= start_date)
+    if end_date:
+        conditions.append(model.Orders.OrderDate <= end_date)
+    return select(*columns, func.sum(rollup.line_revenue()).label("Revenue")).\
+            select_from(model.OrderDetails).\
+            join(model.Orders, model.Orders.OrderID == model.OrderDetails.OrderID).\
+            outerjoin(model.Product, model.Product.ProductID == model.OrderDetails.ProductID).\
+            outerjoin(model.Customer, model.Customer.CustomerID == model.Orders.CustomerID).\
+            filter(and_(*conditions)).\
+            group_by(*columns)
+
+
+def timed(function, runs: int):
+    timings, result = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def max_difference(cube_rows, sql_rows):
+    # Sai lệch tương đối lớn nhất giữa hai kết quả theo từng nhóm (None nếu khác tập nhóm)
+    def key(row):
+        return tuple(str(value) if hasattr(value, "isoformat") else value
+                     for name, value in row.items() if name not in ("Revenue", "Quantity", "Lines"))
+    cube = {key(row): row["Revenue"] for row in cube_rows}
+    sql = {key(row): float(row["Revenue"]) for row in sql_rows}
+    if set(cube) != set(sql):
+        return None
+    return max((abs(cube[group] - sql[group]) / max(1.0, abs(sql[group])) for group in sql), default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the in-memory sales cube with SQL GROUP BY")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--skip-sql", action="store_true", help="only time the cube")
+    args = parser.parse_args()
+
+    from main.database import SessionLocal, engine
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        cube = analytics.SalesCube()
+        cube.load(db.execute(crud.sales_facts_query().execution_options(yield_per=analytics.LOAD_BATCH_SIZE)))
+        report = {"database": engine.dialect.name, "load_s": round(time.perf_counter() - started, 2),
+                  "cube": cube.stats(), "queries": []}
+
+        for group_by, filters, start_date, end_date in QUERIES:
+            start = start_date and date.fromisoformat(start_date)
+            end = end_date and date.fromisoformat(end_date)
+            cube_ms, cube_rows = timed(lambda: cube.revenue(group_by, filters, start, end), args.runs)
+            item = {"group_by": group_by, "filters": filters, "start_date": start_date, "end_date": end_date,
+                    "groups": len(cube_rows), "cube_ms": round(cube_ms, 2)}
+            if not args.skip_sql:
+                query = sql_query(group_by, filters, start, end)
+                sql_ms, sql_rows = timed(lambda: [dict(row._mapping) for row in db.execute(query)], args.runs)
+                item.update({"sql_ms": round(sql_ms, 2), "speedup": round(sql_ms / max(cube_ms, 1e-3), 1),
+                             "max_relative_difference": max_difference(cube_rows, sql_rows)})
+            report["queries"].append(item)
+            print(json.dumps(item), flush=True)
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
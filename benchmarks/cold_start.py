@@ -0,0 +1,79 @@
+# Đo thời gian khởi động nguội: import module, tới khi /health/ready trả 200, tới response đầu tiên
+#
+#   python -m main.benchmarks.cold_start [--runs 5] [--path /employee-invoice-count/?employee_id=4]
+#
+# Mỗi lần chạy một tiến trình uvicorn mới (1 worker) với cùng biến môi trường (DATABASE_URL, ...).
+# Kết quả (trung vị, giây) in ra dạng JSON.
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Thư mục cha của project, để `main.main:app` import được như khi chạy uvicorn
+PROJECT_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_seconds() -> float:
+    code = "import time; started = time.perf_counter(); import main.main; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_PARENT, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_for(url: str, started: float, timeout: float, process) -> float:
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} not ready after {timeout} seconds")
+
+
+def cold_start(path: str, timeout: float = 60.0):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main.main:app", "--port", str(port),
+                                "--log-level", "warning"], cwd=PROJECT_PARENT)
+    try:
+        ready = wait_for(base_url + "/health/ready", started, timeout, process)
+        response = httpx.get(base_url + path, timeout=timeout)
+        first_response = time.perf_counter() - started
+        return {"ready_s": ready, "first_response_s": first_response, "status": response.status_code}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/employee-invoice-count/?employee_id=4")
+    args = parser.parse_args()
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    runs = [cold_start(args.path) for _ in range(args.runs)]
+    print(json.dumps({
+        "runs": args.runs,
+        "path": args.path,
+        "import_s": round(statistics.median(imports), 3),
+        "ready_s": round(statistics.median(run["ready_s"] for run in runs), 3),
+        "first_response_s": round(statistics.median(run["first_response_s"] for run in runs), 3),
+        "statuses": sorted({run["status"] for run in runs}),
+    }, indent=2))
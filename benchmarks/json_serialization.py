@@ -0,0 +1,62 @@
+# Thời gian serialize một danh sách khách hàng (mặc định 10k dòng): đường cũ và FastJSONResponse
+#
+#   python -m main.benchmarks.json_serialization [số dòng ...]
+#
+# - dataframe:  DataFrame -> to_dict(orient='records') -> validate List[schema.Customer] -> jsonable_encoder -> json
+# - validated:  list dict -> validate List[schema.Customer] -> jsonable_encoder -> json (FastAPI với response_model)
+# - fast:       list dict -> fast_json.dumps (orjson nếu có cài)
+import json
+import sys
+import time
+from typing import List
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from main import fast_json, schema
+
+CUSTOMERS = TypeAdapter(List[schema.Customer])
+
+
+def make_rows(n_rows: int):
+    return [{"CustomerID": f"C{index:04d}"[:5], "CompanyName": f"Company {index}", "ContactName": "Maria Anders",
+             "ContactTitle": "Sales Representative", "Address": f"Obere Str. {index}", "City": "Berlin",
+             "PostalCode": "12209", "Country": "Germany", "Phone": "030-0074321", "Fax": "030-0076545"}
+            for index in range(n_rows)]
+
+
+def validated(rows):
+    return json.dumps(jsonable_encoder(CUSTOMERS.validate_python(rows))).encode("utf-8")
+
+
+def dataframe(rows):
+    return validated(pd.DataFrame(rows).to_dict(orient="records"))
+
+
+def timed(fn, rows, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(rows)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def run(n_rows: int, repeat: int = 10):
+    rows = make_rows(n_rows)
+    assert json.loads(fast_json.dumps(rows)) == json.loads(validated(rows))
+    result = {"rows": n_rows, "encoder": "orjson" if fast_json.orjson is not None else "json"}
+    for name, fn in [("dataframe", dataframe), ("validated", validated), ("fast", fast_json.dumps)]:
+        result[f"{name}_ms"] = timed(fn, rows, repeat)
+    result["speedup"] = result["validated_ms"] / result["fast_ms"]
+    return result
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000]
+    for size in sizes:
+        result = run(size)
+        print("  ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in result.items()))
@@ -0,0 +1,86 @@
+# Tải đồng thời lên các endpoint đọc, đo requests/giây và độ trễ p50/p99
+#
+#   python -m main.benchmarks.load_test http://localhost:8001 --baseline http://localhost:8000
+#
+# Chạy bản sync cũ (vd. git stash / checkout commit trước) ở cổng baseline và bản async ở cổng còn lại,
+# cùng số worker uvicorn, trỏ tới cùng CSDL. Kết quả in ra dạng JSON.
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/orderdetail?orderID=10248",
+    "/revenue/monthly",
+    "/product/stock",
+    "/employee-invoices/?employee_id=4",
+    "/customers/?limit=50",
+    "/product-customers/?product_id=11",
+    "/employee-invoice-count/?employee_id=4",
+]
+
+
+def percentile(samples, fraction: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run(base_url: str, paths, concurrency: int, total: int):
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker(client):
+        nonlocal errors
+        for index in counter:
+            path = paths[index % len(paths)]
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "base_url": base_url,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the read endpoints")
+    parser.add_argument("url")
+    parser.add_argument("--baseline", help="URL of the sync build to compare against")
+    parser.add_argument("--path", action="append", dest="paths", help="endpoint to hit (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    report = {"candidate": asyncio.run(run(args.url, paths, args.concurrency, args.requests))}
+    if args.baseline:
+        report["baseline"] = asyncio.run(run(args.baseline, paths, args.concurrency, args.requests))
+        report["rps_ratio"] = round(report["candidate"]["requests_per_second"] /
+                                    report["baseline"]["requests_per_second"], 2)
+        report["p99_ratio"] = round(report["candidate"]["p99_ms"] / report["baseline"]["p99_ms"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
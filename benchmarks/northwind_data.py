@@ -0,0 +1,166 @@
+# Sinh dữ liệu Northwind giả lập theo quy mô (số dòng OrderDetails), cho SQLite hoặc MySQL
+#
+#   python -m main.benchmarks.northwind_data --details 1000000 [--url sqlite:///bench.db] [--reset] [--seed 0]
+#
+# Không có --url thì ghi vào DATABASE_URL. Các bảng khác co giãn theo số dòng chi tiết
+# (sản phẩm, khách hàng, nhà cung cấp); cùng seed cho cùng dữ liệu. Bảng tổng hợp doanh thu được backfill.
+import argparse
+import json
+import random
+import string
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from main import model, rollup
+
+CHUNK_SIZE = 20000
+START_DATE = date(1996, 7, 4)
+DAYS = 3650
+CATEGORIES = ["Beverages", "Condiments", "Confections", "Dairy Products", "Grains/Cereals",
+              "Meat/Poultry", "Produce", "Seafood"]
+NAME_WORDS = ["Chai", "Chang", "Aniseed", "Syrup", "Cajun", "Seasoning", "Gumbo", "Mix", "Grandma", "Boysenberry",
+              "Spread", "Organic", "Dried", "Pears", "Northwoods", "Cranberry", "Sauce", "Mishi", "Kobe", "Niku",
+              "Ikura", "Queso", "Cabrales", "Manchego", "Konbu", "Tofu", "Genen", "Shouyu", "Pavlova", "Alice",
+              "Mutton", "Carnarvon", "Tigers", "Teatime", "Chocolate", "Biscuits", "Marmalade", "Scones",
+              "Gustaf", "Knackebrod", "Tunnbrod", "Guarana", "Fantastica", "Nord-Ost", "Matjeshering",
+              "Gorgonzola", "Telino", "Mascarpone", "Fabioli", "Geitost", "Sasquatch", "Ale", "Steeleye", "Stout"]
+COUNTRIES = ["Germany", "Mexico", "UK", "Sweden", "France", "Spain", "Canada", "Argentina", "Switzerland",
+             "Brazil", "Austria", "Italy", "Portugal", "USA", "Venezuela", "Ireland", "Belgium", "Norway"]
+SHIPPERS = [("Speedy Express", "(503) 555-9831"), ("United Package", "(503) 555-3199"),
+            ("Federal Shipping", "(503) 555-9931")]
+
+
+def scale(details: int):
+    # Tỉ lệ gần với Northwind gốc (2155 dòng chi tiết, 77 sản phẩm, 91 khách hàng, 29 nhà cung cấp)
+    products = max(77, details // 2000)
+    return {
+        "products": products,
+        "customers": max(91, details // 250),
+        "suppliers": max(29, products // 20),
+    }
+
+
+def customer_id(index: int) -> str:
+    # 5 chữ cái in hoa, khác nhau với mọi index < 26**5
+    letters = []
+    for _ in range(5):
+        index, rest = divmod(index, 26)
+        letters.append(string.ascii_uppercase[rest])
+    return "".join(reversed(letters))
+
+
+def chunked(rows, size: int = CHUNK_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write(connection, entity, rows):
+    count = 0
+    for batch in chunked(rows):
+        connection.execute(insert(entity), batch)
+        count += len(batch)
+    return count
+
+
+def product_rows(rnd: random.Random, count: int, suppliers: int):
+    for product_id in range(1, count + 1):
+        name = f"{rnd.choice(NAME_WORDS)} {rnd.choice(NAME_WORDS)} {product_id}"
+        stock = rnd.randint(0, 120)
+        yield {"ProductID": product_id, "ProductName": name[:40], "SupplierID": rnd.randint(1, suppliers),
+               "CategoryID": rnd.randint(1, len(CATEGORIES)), "QuantityPerUnit": f"{rnd.randint(1, 48)} units",
+               "UnitPrice": rnd.randint(250, 26350) / 100, "UnitsInStock": stock * 1000,
+               "UnitsOnOrder": rnd.choice([0, 0, 0, 10, 40, 70]), "ReorderLevel": rnd.choice([0, 5, 10, 15, 25, 30]),
+               "Discontinued": rnd.random() < 0.1}
+
+
+def customer_rows(rnd: random.Random, count: int):
+    for index in range(count):
+        country = rnd.choice(COUNTRIES)
+        yield {"CustomerID": customer_id(index), "CompanyName": f"Company {index}",
+               "ContactName": f"Contact {index}", "ContactTitle": "Sales Representative",
+               "Address": f"{rnd.randint(1, 999)} Main St.", "City": f"City {index % 500}",
+               "PostalCode": None if rnd.random() < 0.05 else f"{rnd.randint(10000, 99999)}",
+               "Country": country, "Phone": f"{rnd.randint(100, 999)}-{rnd.randint(1000, 9999)}",
+               "Fax": None if rnd.random() < 0.3 else f"{rnd.randint(100, 999)}-{rnd.randint(1000, 9999)}"}
+
+
+def order_rows(rnd: random.Random, details: int, products: int, customers: int, orders_out: list):
+    # Sinh OrderDetails; các dòng Orders tương ứng được thêm vào orders_out (ngày tăng dần theo OrderID)
+    written, order_id = 0, 0
+    n_orders = max(1, details // 3)
+    while written < details:
+        order_id += 1
+        order_date = START_DATE + timedelta(days=min(DAYS, order_id * DAYS // n_orders))
+        orders_out.append({"OrderID": order_id, "CustomerID": customer_id(rnd.randrange(customers)),
+                           "EmployeeID": rnd.randint(1, 9), "OrderDate": order_date})
+        lines = min(details - written, rnd.randint(1, 5), products)
+        for product_id in rnd.sample(range(1, products + 1), lines):
+            yield {"OrderID": order_id, "ProductID": product_id, "UnitPrice": rnd.randint(200, 26350) / 100,
+                   "Quantity": rnd.randint(1, 120), "Discount": rnd.choice([0, 0, 0, 0.05, 0.1, 0.15, 0.2, 0.25])}
+        written += lines
+
+
+def generate(engine, details: int, seed: int = 0, reset: bool = False):
+    rnd = random.Random(seed)
+    sizes = scale(details)
+    if reset:
+        model.Base.metadata.drop_all(bind=engine)
+    model.Base.metadata.create_all(bind=engine)
+
+    started = time.perf_counter()
+    counts = {}
+    with engine.begin() as connection:
+        if connection.execute(select(func.count()).select_from(model.Orders)).scalar_one():
+            raise SystemExit("Database already has orders; use --reset to drop and recreate the tables")
+        counts["categories"] = write(connection, model.Category,
+                                     ({"CategoryID": index, "CategoryName": name, "Description": name}
+                                      for index, name in enumerate(CATEGORIES, start=1)))
+        counts["suppliers"] = write(connection, model.Supplier,
+                                    ({"SupplierID": index, "CompanyName": f"Supplier {index}",
+                                      "Country": rnd.choice(COUNTRIES)} for index in range(1, sizes["suppliers"] + 1)))
+        counts["shippers"] = write(connection, model.Shipper,
+                                   ({"CompanyName": name, "Phone": phone} for name, phone in SHIPPERS))
+        counts["products"] = write(connection, model.Product,
+                                   product_rows(rnd, sizes["products"], sizes["suppliers"]))
+        counts["customers"] = write(connection, model.Customer, customer_rows(rnd, sizes["customers"]))
+
+        # Orders ghi trước từng lô chi tiết để khóa ngoại luôn hợp lệ
+        counts["orders"] = counts["orderdetails"] = 0
+        orders = []
+        for batch in chunked(order_rows(rnd, details, sizes["products"], sizes["customers"], orders)):
+            counts["orders"] += write(connection, model.Orders, orders)
+            orders.clear()
+            connection.execute(insert(model.OrderDetails), batch)
+            counts["orderdetails"] += len(batch)
+
+    db = sessionmaker(bind=engine)()
+    try:
+        rollup.backfill(db)
+    finally:
+        db.close()
+    counts["seconds"] = round(time.perf_counter() - started, 2)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the Northwind schema with synthetic data")
+    parser.add_argument("--details", type=int, default=100_000, help="number of OrderDetails rows")
+    parser.add_argument("--url", help="database URL (default: DATABASE_URL)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table first")
+    args = parser.parse_args()
+
+    if args.url:
+        engine = create_engine(args.url)
+    else:
+        from main.database import engine
+    print(json.dumps(generate(engine, args.details, args.seed, args.reset), indent=2))
@@ -0,0 +1,66 @@
+# So sánh độ trễ /revenue/{time_period}: truy vấn gốc (join + GROUP BY) và bảng tổng hợp
+#
+#   python -m main.benchmarks.revenue_rollup [số đơn hàng ...]
+#
+# Chạy trên SQLite trong bộ nhớ nên không cần MySQL.
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from main import model, rollup
+
+
+def seed(db, n_orders: int, lines_per_order: int = 3, n_products: int = 77):
+    rnd = random.Random(n_orders)
+    start = date(1996, 7, 4)
+    orders, details = [], []
+    for order_id in range(1, n_orders + 1):
+        orders.append({"OrderID": order_id, "CustomerID": "ALFKI", "EmployeeID": rnd.randint(1, 9),
+                       "OrderDate": start + timedelta(days=rnd.randint(0, 3650))})
+        for product_id in rnd.sample(range(1, n_products + 1), lines_per_order):
+            details.append({"OrderID": order_id, "ProductID": product_id, "UnitPrice": rnd.randint(200, 26350) / 100,
+                            "Quantity": rnd.randint(1, 120), "Discount": rnd.choice([0, 0.05, 0.1, 0.15, 0.2, 0.25])})
+    db.execute(insert(model.Orders), orders)
+    db.execute(insert(model.OrderDetails), details)
+    db.commit()
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def run(n_orders: int, repeat: int = 20):
+    engine = create_engine("sqlite://")
+    model.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, n_orders)
+    rollup.backfill(db)
+    assert not rollup.verify(db), "summary tables disagree with raw aggregation"
+
+    result = {"orders": n_orders}
+    for period, raw_query, summary in [("daily", rollup.raw_daily_revenue_query, rollup.get_daily_revenue),
+                                       ("monthly", rollup.raw_monthly_revenue_query, rollup.get_monthly_revenue),
+                                       ("yearly", rollup.raw_yearly_revenue_query, rollup.get_yearly_revenue)]:
+        result[f"{period}_raw_ms"] = timed(lambda: db.execute(raw_query()).all(), repeat)
+        result[f"{period}_summary_ms"] = timed(lambda: summary(db), repeat)
+    db.close()
+    engine.dispose()
+    return result
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for size in sizes:
+        result = run(size)
+        print("  ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in result.items()))
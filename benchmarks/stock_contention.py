@@ -0,0 +1,121 @@
+# Nhiều luồng cùng đặt hàng một sản phẩm "hot": đo số hóa đơn/giây và kiểm tra không bán vượt tồn kho
+#
+#   python -m main.benchmarks.stock_contention [--threads 32] [--stock 5000] [--orders 20000]
+#
+# Chạy trên CSDL trong DATABASE_URL (MySQL local). Tạo một sản phẩm tạm và các hóa đơn ngày 1900-01-01,
+# xóa hết khi chạy xong. Mã lỗi 1 nếu oversell > 0.
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, func, select
+
+from main import crud, model, schema
+from main.database import SessionLocal
+
+BENCH_DATE = datetime(1900, 1, 1)
+
+
+def setup(stock: int):
+    db = SessionLocal()
+    try:
+        customer_id = db.scalar(select(func.min(model.Customer.CustomerID)))
+        product = model.Product(ProductName=f"stock-bench-{time.time_ns()}", UnitPrice=10.0,
+                                UnitsInStock=stock, UnitsOnOrder=0, ReorderLevel=0, Discontinued=False)
+        db.add(product)
+        db.commit()
+        return product.ProductID, customer_id
+    finally:
+        db.close()
+
+
+def worker(product_id: int, customer_id: str, counter, stats, lock, seed: int):
+    rnd = random.Random(seed)
+    db = SessionLocal()
+    placed = sold = rejected = errors = 0
+    try:
+        for _ in counter:
+            quantity = rnd.randint(1, 3)
+            order = schema.OrderCreate(CustomerID=customer_id, EmployeeID=1, OrderDate=BENCH_DATE,
+                                       Products=[schema.OrderProductCreate(ProductID=product_id, Quantity=quantity,
+                                                                           UnitPrice=10.0, Discount=0.0)])
+            try:
+                crud.create_orders(db, [order])
+                db.commit()
+                placed += 1
+                sold += quantity
+            except crud.InsufficientStock:
+                db.rollback()
+                rejected += 1
+            except Exception:
+                db.rollback()
+                errors += 1
+    finally:
+        db.close()
+        with lock:
+            stats["placed"] += placed
+            stats["sold"] += sold
+            stats["rejected"] += rejected
+            stats["errors"] += errors
+
+
+def check_and_cleanup(product_id: int, stock: int, sold: int):
+    db = SessionLocal()
+    try:
+        final_stock = db.scalar(select(model.Product.UnitsInStock).where(model.Product.ProductID == product_id))
+        recorded = db.scalar(select(func.coalesce(func.sum(model.OrderDetails.Quantity), 0)).
+                             where(model.OrderDetails.ProductID == product_id))
+        # Xóa dòng con trước hóa đơn (khóa ngoại OrderDetails -> Orders)
+        order_ids = list(db.scalars(select(model.OrderDetails.OrderID.distinct()).
+                                    where(model.OrderDetails.ProductID == product_id)))
+        db.execute(delete(model.OrderDetails).where(model.OrderDetails.ProductID == product_id))
+        db.execute(delete(model.Orders).where(model.Orders.OrderID.in_(order_ids))
+                   .execution_options(synchronize_session=False))
+        db.execute(delete(model.Product).where(model.Product.ProductID == product_id))
+        db.execute(delete(model.RevenueDaily).where(model.RevenueDaily.OrderDate == BENCH_DATE.date()))
+        db.execute(delete(model.RevenueMonthly).where(model.RevenueMonthly.Year == BENCH_DATE.year))
+        db.execute(delete(model.RevenueYearly).where(model.RevenueYearly.Year == BENCH_DATE.year))
+        db.commit()
+    finally:
+        db.close()
+    # Bán vượt: tổng số lượng đã ghi nhận lớn hơn tồn kho ban đầu, hoặc kho và hóa đơn lệch nhau
+    return {
+        "final_stock": final_stock,
+        "recorded_quantity": recorded,
+        "oversell": max(0, recorded - stock) + max(0, -final_stock) + abs((stock - final_stock) - recorded),
+        "consistent": recorded == sold == stock - final_stock,
+    }
+
+
+def run(threads: int, stock: int, orders: int):
+    product_id, customer_id = setup(stock)
+    counter = iter(range(orders))
+    lock = threading.Lock()
+    stats = {"placed": 0, "sold": 0, "rejected": 0, "errors": 0}
+    pool = [threading.Thread(target=worker, args=(product_id, customer_id, counter, stats, lock, index))
+            for index in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    result = {"threads": threads, "initial_stock": stock, "attempts": orders, **stats,
+              "seconds": round(seconds, 3), "orders_per_second": round((stats["placed"] + stats["rejected"]) / seconds, 1)}
+    result.update(check_and_cleanup(product_id, stock, stats["sold"]))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--stock", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=20000)
+    args = parser.parse_args()
+    result = run(args.threads, args.stock, args.orders)
+    print(json.dumps(result, indent=2))
+    raise SystemExit(1 if result["oversell"] else 0)
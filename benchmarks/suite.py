@@ -0,0 +1,247 @@
+# Bộ benchmark cho toàn bộ endpoint: throughput và độ trễ p50/p99 từng kịch bản, xuất JSON
+#
+#   python -m main.benchmarks.northwind_data --details 1000000 --reset
+#   uvicorn main:app --port 8000                    (cùng DATABASE_URL)
+#   python -m main.benchmarks.suite http://localhost:8000 --output run.json
+#   python -m main.benchmarks.suite http://localhost:8000 --baseline run.json --threshold 0.2
+#
+# Giá trị ngẫu nhiên (OrderID, EmployeeID, tên sản phẩm...) lấy từ CSDL trong DATABASE_URL với seed cố định.
+# Có --baseline thì mã lỗi 1 khi một kịch bản có rps thấp hơn hoặc p99 cao hơn baseline quá threshold.
+#
+# Không đo: /imports, /imports/{job_id} (đã được gọi khi chờ các kịch bản upload_*), /cache/stats, /metrics,
+# /metrics/pool, /health/*, /analytics/stats (endpoint vận hành, không đọc dữ liệu nghiệp vụ).
+import argparse
+import asyncio
+import json
+import platform
+import random
+import string
+import time
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy import func, select
+
+from main import model
+from main.benchmarks.load_test import percentile
+
+UPLOAD_POLL_INTERVAL = 0.05
+
+
+class Context:
+    # Khoảng giá trị có thật trong CSDL để dựng request
+    def __init__(self, engine, seed: int):
+        self.rnd = random.Random(seed)
+        with engine.connect() as connection:
+            self.min_order, self.max_order = connection.execute(
+                select(func.min(model.Orders.OrderID), func.max(model.Orders.OrderID))).one()
+            self.first_date, self.last_date = connection.execute(
+                select(func.min(model.Orders.OrderDate), func.max(model.Orders.OrderDate))).one()
+            self.product_ids = connection.execute(select(model.Product.ProductID).
+                                                  where(model.Product.UnitsInStock > 1000)).scalars().all()
+            self.employee_ids = connection.execute(select(model.Orders.EmployeeID).distinct()).scalars().all()
+            self.customer_ids = connection.execute(select(model.Customer.CustomerID).limit(1000)).scalars().all()
+            names = connection.execute(select(model.Product.ProductName).limit(1000)).scalars().all()
+        if self.min_order is None or not self.product_ids:
+            raise SystemExit("Database has no orders or products; run main.benchmarks.northwind_data first")
+        self.words = sorted({word for name in names if name for word in name.split() if not word.isdigit()})
+
+    def order_id(self):
+        return self.rnd.randint(self.min_order, self.max_order)
+
+    def order(self):
+        lines = self.rnd.sample(self.product_ids, min(3, len(self.product_ids)))
+        return {"CustomerID": self.rnd.choice(self.customer_ids), "EmployeeID": self.rnd.choice(self.employee_ids),
+                "OrderDate": f"{self.last_date}T00:00:00",
+                "Products": [{"ProductID": product_id, "Quantity": self.rnd.randint(1, 5),
+                              "UnitPrice": self.rnd.randint(200, 5000) / 100, "Discount": 0}
+                             for product_id in lines]}
+
+    def unique_key(self, length: int):
+        return "".join(self.rnd.choice(string.ascii_uppercase + string.digits) for _ in range(length))
+
+
+def get(path):
+    return lambda ctx: ("GET", path(ctx) if callable(path) else path, {})
+
+
+def post_json(path, body):
+    return lambda ctx: ("POST", path, {"json": body(ctx)})
+
+
+def upload(path, header, row, rows: int = 200):
+    # Mỗi request là một file CSV mới; độ trễ tính tới khi job nhập chạy xong
+    def build(ctx):
+        lines = [header] + [row(ctx) for _ in range(rows)]
+        return "UPLOAD", path, {"files": {"file": ("bench.csv", "\n".join(lines).encode(), "text/csv")}}
+    return build
+
+
+def performance_range(ctx):
+    start = ctx.first_date + timedelta(days=ctx.rnd.randint(0, max(0, (ctx.last_date - ctx.first_date).days - 30)))
+    return f"/employee-performance/?start_date={start}&end_date={start + timedelta(days=30)}"
+
+
+def export_range(ctx):
+    start = ctx.first_date + timedelta(days=ctx.rnd.randint(0, max(0, (ctx.last_date - ctx.first_date).days - 90)))
+    return f"start_date={start}&end_date={start + timedelta(days=90)}"
+
+
+# name -> (hàm dựng request, số request mặc định)
+SCENARIOS = {
+    "orderdetail": (get(lambda ctx: f"/orderdetail?orderID={ctx.order_id()}"), 2000),
+    "orderdetail_batch": (post_json("/orderdetail/batch",
+                                    lambda ctx: {"OrderIDs": [ctx.order_id() for _ in range(100)]}), 300),
+    "revenue_daily": (get("/revenue/daily"), 1000),
+    "revenue_monthly": (get("/revenue/monthly"), 1000),
+    "revenue_yearly": (get("/revenue/yearly"), 1000),
+    "products_search": (get(lambda ctx: f"/products/search?product_name={ctx.rnd.choice(ctx.words)}"), 2000),
+    "products_autocomplete": (get(lambda ctx: f"/products/autocomplete?prefix={ctx.rnd.choice(ctx.words)[:3]}"), 2000),
+    "product_stock": (get("/product/stock"), 1000),
+    "inventory_by_category": (get("/inventory/by-category"), 1000),
+    "inventory_by_supplier": (get("/inventory/by-supplier"), 1000),
+    "inventory_reorder": (get("/inventory/reorder"), 1000),
+    "employee_invoices": (get(lambda ctx: f"/employee-invoices/?employee_id={ctx.rnd.choice(ctx.employee_ids)}"), 100),
+    "employee_invoice_count": (get(lambda ctx: f"/employee-invoice-count/?employee_id={ctx.rnd.choice(ctx.employee_ids)}"), 2000),
+    "employee_performance": (get(performance_range), 300),
+    "customers": (get("/customers/?limit=100"), 2000),
+    "customers_export": (get("/customers/export"), 20),
+    "product_customers": (get(lambda ctx: f"/product-customers/?product_id={ctx.rnd.choice(ctx.product_ids)}"), 200),
+    "orders_export": (get(lambda ctx: f"/orders/export?format=parquet&{export_range(ctx)}"), 20),
+    "analytics_revenue": (get("/analytics/revenue?group_by=category,year"), 500),
+    "products_also_bought": (get(lambda ctx: f"/products/also-bought?product_id={ctx.rnd.choice(ctx.product_ids)}"), 1000),
+    "customers_similar": (get(lambda ctx: f"/customers/similar?customer_id={ctx.rnd.choice(ctx.customer_ids)}"), 500),
+    "category_create": (post_json("/category", lambda ctx: {"CategoryName": f"Bench {ctx.unique_key(8)}",
+                                                            "Description": "Benchmark category"}), 200),
+    "supplier_create": (post_json("/supplier", lambda ctx: {
+        "CompanyName": f"Bench {ctx.unique_key(10)}", "ContactName": "Name", "ContactTitle": "Owner",
+        "Address": "Street 1", "City": "City", "Region": "Region", "PostalCode": "12345", "Country": "Country",
+        "Phone": "555", "Fax": "555", "HomePage": "example.com"}), 200),
+    "orders_create": (post_json("/orders/", lambda ctx: ctx.order()), 1000),
+    "orders_bulk": (post_json("/orders/bulk", lambda ctx: {"Orders": [ctx.order() for _ in range(100)]}), 50),
+    "upload_shippers": (upload("/Shipper/upload-data", "CompanyName,Phone",
+                               lambda ctx: f"Shipper {ctx.unique_key(8)},555-{ctx.rnd.randint(1000, 9999)}"), 10),
+    "upload_products": (upload("/products/upload-data", ",".join(["ProductName", "SupplierID", "CategoryID",
+                                                                  "QuantityPerUnit", "UnitPrice", "UnitsInStock",
+                                                                  "UnitsOnOrder", "ReorderLevel", "Discontinued"]),
+                               lambda ctx: f"Bench {ctx.unique_key(10)},1,1,10 boxes,9.5,100,0,10,0"), 10),
+    "upload_customers": (upload("/customers/upload-data", ",".join(["CustomerID", "CompanyName", "ContactName",
+                                                                    "ContactTitle", "Address", "City", "PostalCode",
+                                                                    "Country", "Phone", "Fax"]),
+                                lambda ctx: f"{ctx.rnd.choice(string.digits)}{ctx.unique_key(4)},Bench,Name,Owner,"
+                                            f"Street 1,City,12345,Country,555,"), 10),
+}
+
+
+async def send(client: httpx.AsyncClient, method: str, path: str, options: dict):
+    # Trả về True nếu request (và job nhập, nếu là upload) thành công
+    if method != "UPLOAD":
+        response = await client.request(method, path, **options)
+        return response.status_code < 400
+    response = await client.post(path, **options)
+    if response.status_code != 202:
+        return False
+    status_url = response.json()["status_url"]
+    while True:
+        job = (await client.get(status_url)).json()
+        if job["status"] not in ("queued", "running"):
+            return job["status"] == "succeeded"
+        await asyncio.sleep(UPLOAD_POLL_INTERVAL)
+
+
+async def run_scenario(client, ctx: Context, build, total: int, concurrency: int):
+    requests = [build(ctx) for _ in range(total)]
+    latencies, errors = [], 0
+    queue = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for method, path, options in queue:
+            started = time.perf_counter()
+            try:
+                ok = await send(client, method, path, options)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": errors,
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+async def run(base_url: str, ctx: Context, names, concurrency: int, scale: float):
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        for name in names:
+            build, total = SCENARIOS[name]
+            results[name] = await run_scenario(client, ctx, build, max(1, int(total * scale)),
+                                               min(concurrency, max(1, int(total * scale))))
+            print(f"{name:24} {json.dumps(results[name])}", flush=True)
+    return results
+
+
+def regressions(report: dict, baseline: dict, threshold: float):
+    found = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        if result["requests_per_second"] < before["requests_per_second"] * (1 - threshold):
+            found.append(f"{name}: requests_per_second {before['requests_per_second']} -> {result['requests_per_second']}")
+        if result["p99_ms"] > before["p99_ms"] * (1 + threshold):
+            found.append(f"{name}: p99_ms {before['p99_ms']} -> {result['p99_ms']}")
+        if result["errors"] > before["errors"]:
+            found.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every endpoint and compare with a baseline run")
+    parser.add_argument("url", nargs="?", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", action="append", dest="scenarios", choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the request count of every scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    from main.database import engine
+    ctx = Context(engine, args.seed)
+    names = args.scenarios or list(SCENARIOS)
+    report = {
+        "url": args.url,
+        "date": date.today().isoformat(),
+        "python": platform.python_version(),
+        "database": engine.dialect.name,
+        "orders": ctx.max_order - ctx.min_order + 1,
+        "concurrency": args.concurrency,
+        "scale": args.scale,
+        "seed": args.seed,
+        "scenarios": asyncio.run(run(args.url, ctx, names, args.concurrency, args.scale)),
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            found = regressions(report, json.load(file), args.threshold)
+        for line in found:
+            print("REGRESSION", line)
+        raise SystemExit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
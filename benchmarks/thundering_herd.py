@@ -0,0 +1,88 @@
+# Thundering herd: nhiều client cùng gọi một endpoint nặng ngay sau khi cache bị xóa (vd. refresh dashboard
+# sau khi có hóa đơn mới). So sánh số truy vấn SQL và độ trễ khi bật / tắt gộp request (single_flight.py)
+#
+#   python -m main.benchmarks.thundering_herd [--clients 50] [--bursts 20] [--path /revenue/monthly]
+#
+# Chạy app trong tiến trình (httpx ASGITransport) trên CSDL trong DATABASE_URL; trước mỗi đợt xóa cache kết quả.
+# Số truy vấn lấy từ số liệu theo route của request_metrics (giống GET /metrics). Kết quả in ra dạng JSON.
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from main import main as app_module, request_metrics
+from main.benchmarks.load_test import percentile
+
+DEFAULT_PATHS = ["/revenue/monthly", "/revenue/daily", "/product/stock"]
+
+
+def route_queries():
+    return sum(metrics.queries for metrics in request_metrics.registry.routes.values())
+
+
+async def burst(client: httpx.AsyncClient, path: str, clients: int):
+    # Tất cả client chờ cùng một tín hiệu rồi gửi request gần như đồng thời
+    start = asyncio.Event()
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        await start.wait()
+        started = time.perf_counter()
+        response = await client.get(path)
+        latencies.append((time.perf_counter() - started) * 1000)
+        errors += response.status_code >= 400
+
+    tasks = [asyncio.create_task(one()) for _ in range(clients)]
+    await asyncio.sleep(0)
+    start.set()
+    await asyncio.gather(*tasks)
+    return latencies, errors
+
+
+async def run(app, path: str, clients: int, bursts: int, coalescing: bool):
+    app_module.READ_COALESCING = coalescing
+    flights = {flight.name: flight.coalesced for flight in (app_module.revenue_flight, app_module.stock_flight)}
+    latencies, errors = [], 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get(path)  # nạp sẵn (kết nối pool, import) trước khi đo
+        queries_before = route_queries()
+        started = time.perf_counter()
+        for _ in range(bursts):
+            app_module.result_cache.clear()
+            burst_latencies, burst_errors = await burst(client, path, clients)
+            latencies += burst_latencies
+            errors += burst_errors
+        elapsed = time.perf_counter() - started
+    coalesced = sum(flight.coalesced - flights[flight.name]
+                    for flight in (app_module.revenue_flight, app_module.stock_flight))
+    return {
+        "coalescing": coalescing,
+        "requests": clients * bursts,
+        "errors": errors,
+        "sql_queries": route_queries() - queries_before,
+        "coalesced_requests": coalesced,
+        "seconds": round(elapsed, 3),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+async def main(paths, clients: int, bursts: int):
+    app = app_module.create_app()
+    report = {}
+    for path in paths:
+        report[path] = [await run(app, path, clients, bursts, coalescing) for coalescing in (False, True)]
+        print(json.dumps({path: report[path]}), flush=True)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Burst identical requests at cold-cache endpoints")
+    parser.add_argument("--path", action="append", dest="paths", help=f"endpoint (repeatable, default: {DEFAULT_PATHS})")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent requests per burst")
+    parser.add_argument("--bursts", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.paths or DEFAULT_PATHS, args.clients, args.bursts)), indent=2))
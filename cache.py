@@ -0,0 +1,110 @@
+# Cache kết quả trong tiến trình cho các endpoint đọc (LRU + TTL + giới hạn số phần tử)
+#
+# Mỗi phần tử gắn với một hoặc nhiều tag (vd. "revenue", "stock"). Endpoint ghi gọi
+# invalidate(tag) sau khi commit để giải phóng các phần tử cũ trong cùng tiến trình. Tiến trình khác (worker
+# uvicorn khác) không biết lệnh ghi: vì vậy khóa của endpoint kèm phiên bản các bảng (main.cache_versions, ETag),
+# lệnh ghi ở bất kỳ worker nào đổi phiên bản nên phần tử cũ không còn được trúng và chỉ chờ LRU / ttl loại bỏ.
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, tags, value)
+        self._generations = {}          # tag -> số lần invalidate
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key, compute, tags=()):
+        found, value, generations = self._lookup(key, tags)
+        if found:
+            return value
+        value = compute()
+        self._store(key, tags, generations, value)
+        return value
+
+    async def aget_or_compute(self, key, compute, tags=()):
+        # Giống get_or_compute nhưng compute là coroutine function
+        found, value, generations = self._lookup(key, tags)
+        if found:
+            return value
+        value = await compute()
+        self._store(key, tags, generations, value)
+        return value
+
+    def generation(self, *tags):
+        # Số lần invalidate của các tag: đổi ngay khi có lệnh ghi, dùng làm một phần khóa của truy vấn đang chạy
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def _lookup(self, key, tags):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[2], None
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None, tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def _store(self, key, tags, generations, value):
+        with self._lock:
+            # Bỏ qua nếu có lệnh ghi invalidate tag trong lúc đang tính
+            if generations != tuple(self._generations.get(tag, 0) for tag in tags):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, tuple(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [key for key, entry in self._entries.items() if set(entry[1]) & set(tags)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class NullCache:
+    # Cùng giao diện nhưng luôn tính lại (vd. client vừa ghi, cần đọc thẳng từ primary)
+    def generation(self, *tags):
+        return ()
+
+    def get_or_compute(self, key, compute, tags=()):
+        return compute()
+
+    async def aget_or_compute(self, key, compute, tags=()):
+        return await compute()
@@ -1,6 +1,11 @@
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from sqlalchemy import distinct, false, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from main import model, schema
+from main import model, rollup, schema
 
 def get_od(db: Session, skip: int = 0, limit: int = 100):
     return db.query(model.OrderDetails).offset(skip).limit(limit).all()
@@ -19,3 +24,278 @@ def get_orderID(db: Session):
 
 def get_category_name(db:Session):
     return db.query(model.Category.CategoryName).all()
+
+
+# Các hàm *_query trả về câu lệnh select (dùng chung cho endpoint và tests/test_explain.py)
+def invoice_lines_query(order_ids: List[int]):
+    # Một truy vấn join duy nhất theo khóa chính OrderID, tính luôn giá trị từng dòng
+    return select(model.Orders.OrderID,
+                  model.Orders.CustomerID,
+                  model.Orders.OrderDate,
+                  model.Product.ProductName,
+                  model.OrderDetails.Quantity,
+                  model.OrderDetails.UnitPrice,
+                  model.OrderDetails.Discount,
+                  rollup.line_revenue().label('LineValue')).\
+            join(model.OrderDetails, model.OrderDetails.OrderID == model.Orders.OrderID).\
+            join(model.Product, model.Product.ProductID == model.OrderDetails.ProductID).\
+            filter(model.Orders.OrderID.in_(order_ids)).\
+            order_by(model.Orders.OrderID)
+
+async def get_invoice_lines(db: AsyncSession, order_ids: List[int]):
+    return (await db.execute(invoice_lines_query(order_ids))).all()
+
+async def get_orderID_range(db: AsyncSession):
+    return (await db.execute(select(func.min(model.Orders.OrderID), func.max(model.Orders.OrderID)))).one()
+
+
+def employee_invoices_query(employee_id: int):
+    return select(*model.OrderDetails.__table__.columns).\
+            join(model.Orders, model.OrderDetails.OrderID == model.Orders.OrderID).\
+            filter(model.Orders.EmployeeID == employee_id)
+
+def employee_invoice_count_query(employee_id: int):
+    return select(func.count()).select_from(model.Orders).filter(model.Orders.EmployeeID == employee_id)
+
+def product_customers_query(product_id: int):
+    return select(*model.Customer.__table__.columns).\
+            join(model.Orders, model.Customer.CustomerID == model.Orders.CustomerID).\
+            join(model.OrderDetails, model.Orders.OrderID == model.OrderDetails.OrderID).\
+            filter(model.OrderDetails.ProductID == product_id).\
+            distinct()
+
+def order_id_filter(query, after_order_id: Optional[int] = None, order_id_range: Optional[tuple] = None):
+    # Hóa đơn sau mốc OrderID, hoặc trong một khoảng OrderID chờ commit (incremental.py). Mỗi khoảng một truy vấn
+    # riêng: OR giữa các điều kiện làm SQLite / MySQL quét cả chỉ mục để giữ ORDER BY OrderID
+    order_id = model.OrderDetails.OrderID
+    if after_order_id is not None:
+        query = query.filter(order_id > after_order_id)
+    if order_id_range is not None:
+        query = query.filter(order_id.between(*order_id_range))
+    return query
+
+def co_purchase_lines_query(after_order_id: Optional[int] = None, order_id_range: Optional[tuple] = None):
+    # (OrderID, CustomerID, ProductID) theo thứ tự OrderID để dựng / cập nhật ma trận đồng mua (recommendations.py)
+    query = select(model.OrderDetails.OrderID, model.Orders.CustomerID, model.OrderDetails.ProductID).\
+            join(model.Orders, model.Orders.OrderID == model.OrderDetails.OrderID).\
+            order_by(model.OrderDetails.OrderID)
+    return order_id_filter(query, after_order_id, order_id_range)
+
+def sales_facts_query(after_order_id: Optional[int] = None, order_ids: Optional[List[int]] = None,
+                      order_id_range: Optional[tuple] = None):
+    # Dòng fact cho cube doanh thu (analytics.py), thứ tự cột khớp analytics.DICTIONARY_DIMENSIONS.
+    # Outer join để tổng doanh thu khớp bảng tổng hợp kể cả khi sản phẩm / khách hàng đã bị xóa;
+    # hóa đơn không có OrderDate bị bỏ qua như trong rollup.add_revenue
+    query = select(model.OrderDetails.OrderID, model.Orders.OrderDate, model.OrderDetails.ProductID,
+                   model.Product.CategoryID, model.Product.SupplierID, model.Orders.CustomerID,
+                   model.Customer.Country, model.Orders.EmployeeID, model.OrderDetails.UnitPrice,
+                   model.OrderDetails.Quantity, model.OrderDetails.Discount).\
+            join(model.Orders, model.Orders.OrderID == model.OrderDetails.OrderID).\
+            outerjoin(model.Product, model.Product.ProductID == model.OrderDetails.ProductID).\
+            outerjoin(model.Customer, model.Customer.CustomerID == model.Orders.CustomerID).\
+            filter(model.Orders.OrderDate.isnot(None)).\
+            order_by(model.OrderDetails.OrderID)
+    query = order_id_filter(query, after_order_id, order_id_range)
+    if order_ids is not None:
+        query = query.filter(model.OrderDetails.OrderID.in_(order_ids))
+    return query
+
+def order_facts_query(start_date: Optional[date] = None, end_date: Optional[date] = None,
+                      employee_id: Optional[int] = None):
+    # Dòng hóa đơn kèm sản phẩm và khách hàng để xuất Arrow / Parquet, theo thứ tự khóa chính OrderDetails.
+    # Giữ kiểu gốc từng cột: ListPrice là Product.UnitPrice (Numeric), UnitPrice là giá bán trên OrderDetails (Float)
+    query = select(model.OrderDetails.OrderID, model.Orders.OrderDate, model.Orders.EmployeeID,
+                   model.Orders.CustomerID, model.Customer.CompanyName, model.Customer.City, model.Customer.Country,
+                   model.OrderDetails.ProductID, model.Product.ProductName, model.Product.CategoryID,
+                   model.Product.SupplierID, model.Product.UnitPrice.label('ListPrice'),
+                   model.OrderDetails.UnitPrice, model.OrderDetails.Quantity, model.OrderDetails.Discount,
+                   rollup.line_revenue().label('LineValue')).\
+            join(model.Orders, model.Orders.OrderID == model.OrderDetails.OrderID).\
+            outerjoin(model.Product, model.Product.ProductID == model.OrderDetails.ProductID).\
+            outerjoin(model.Customer, model.Customer.CustomerID == model.Orders.CustomerID).\
+            order_by(model.OrderDetails.OrderID, model.OrderDetails.ProductID)
+    if start_date is not None:
+        query = query.filter(model.Orders.OrderDate >= start_date)
+    if end_date is not None:
+        query = query.filter(model.Orders.OrderDate <= end_date)
+    if employee_id is not None:
+        query = query.filter(model.Orders.EmployeeID == employee_id)
+    return query
+
+# Phiên bản bảng cho ETag / Last-Modified (model.TableVersion)
+def table_versions_query(tables: List[str]):
+    return select(model.TableVersion.TableName, model.TableVersion.Version, model.TableVersion.UpdatedAt).\
+            filter(model.TableVersion.TableName.in_(tables))
+
+def bump_table_versions(db: Session, *tables: str):
+    # Gọi trong transaction của lệnh ghi, trước commit: phiên bản mới hiện ra cùng lúc với dữ liệu mới.
+    # Theo thứ tự tên bảng để các transaction khóa các dòng phiên bản theo cùng một thứ tự
+    updated_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    for table in sorted(set(tables)):
+        rollup.upsert_add(db, model.TableVersion, {"TableName": table}, "Version", 1, UpdatedAt=updated_at)
+
+def customers_page_query(after: Optional[str], limit: int, skip: int = 0):
+    query = select(*model.Customer.__table__.columns).order_by(model.Customer.CustomerID).limit(limit)
+    if after is not None:
+        query = query.filter(model.Customer.CustomerID > after)
+    elif skip:
+        query = query.offset(skip)
+    return query
+
+def product_details_query(product_ids: List[int]):
+    return select(*model.Product.__table__.columns).filter(model.Product.ProductID.in_(product_ids))
+
+
+# Tồn kho: tổng hợp trong CSDL
+def stock_aggregates():
+    return (func.count(model.Product.ProductID).label('Products'),
+            func.coalesce(func.sum(model.Product.UnitsInStock), 0).label('UnitsInStock'),
+            func.coalesce(func.sum(model.Product.UnitsOnOrder), 0).label('UnitsOnOrder'),
+            func.coalesce(func.sum(model.Product.UnitsInStock * model.Product.UnitPrice), 0).label('StockValue'))
+
+def stock_products_query():
+    return select(model.Product.ProductID, model.Product.ProductName, model.Product.UnitsInStock).\
+            order_by(model.Product.ProductID)
+
+def total_stock_query():
+    return select(func.coalesce(func.sum(model.Product.UnitsInStock), 0))
+
+def stock_by_category_query(after: Optional[int], limit: int):
+    query = select(model.Product.CategoryID, model.Category.CategoryName, *stock_aggregates()).\
+            outerjoin(model.Category, model.Category.CategoryID == model.Product.CategoryID)
+    if after is not None:
+        query = query.filter(model.Product.CategoryID > after)
+    return query.group_by(model.Product.CategoryID, model.Category.CategoryName).\
+            order_by(model.Product.CategoryID).limit(limit)
+
+def stock_by_supplier_query(after: Optional[int], limit: int):
+    query = select(model.Product.SupplierID, model.Supplier.CompanyName, *stock_aggregates()).\
+            outerjoin(model.Supplier, model.Supplier.SupplierID == model.Product.SupplierID)
+    if after is not None:
+        query = query.filter(model.Product.SupplierID > after)
+    return query.group_by(model.Product.SupplierID, model.Supplier.CompanyName).\
+            order_by(model.Product.SupplierID).limit(limit)
+
+def reorder_products_query(after: Optional[int], limit: int):
+    # Sản phẩm còn kinh doanh có UnitsInStock <= ReorderLevel
+    query = select(model.Product.ProductID,
+                   model.Product.ProductName,
+                   model.Product.SupplierID,
+                   model.Product.CategoryID,
+                   model.Product.UnitsInStock,
+                   model.Product.UnitsOnOrder,
+                   model.Product.ReorderLevel).\
+            filter(model.Product.Discontinued == false(),
+                   model.Product.UnitsInStock <= model.Product.ReorderLevel)
+    if after is not None:
+        query = query.filter(model.Product.ProductID > after)
+    return query.order_by(model.Product.ProductID).limit(limit)
+
+async def _all_dicts(db: AsyncSession, query):
+    return [dict(row) for row in (await db.execute(query)).mappings()]
+
+async def get_total_stock(db: AsyncSession):
+    return int((await db.execute(total_stock_query())).scalar_one())
+
+async def get_stock_products(db: AsyncSession):
+    return await _all_dicts(db, stock_products_query())
+
+async def get_stock_by_category(db: AsyncSession, after: Optional[int], limit: int):
+    return await _all_dicts(db, stock_by_category_query(after, limit))
+
+async def get_stock_by_supplier(db: AsyncSession, after: Optional[int], limit: int):
+    return await _all_dicts(db, stock_by_supplier_query(after, limit))
+
+async def get_reorder_products(db: AsyncSession, after: Optional[int], limit: int):
+    return await _all_dicts(db, reorder_products_query(after, limit))
+
+
+# Hiệu suất nhân viên: một GROUP BY trên Orders.EmployeeID thay vì một truy vấn cho mỗi nhân viên
+def employee_performance_query(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    order_count = func.count(distinct(model.Orders.OrderID))
+    revenue = func.sum(rollup.line_revenue())
+    query = select(model.Orders.EmployeeID,
+                   order_count.label('OrderCount'),
+                   revenue.label('Revenue'),
+                   (revenue / order_count).label('AverageOrderValue')).\
+            join(model.OrderDetails, model.OrderDetails.OrderID == model.Orders.OrderID)
+    if start_date is not None:
+        query = query.filter(model.Orders.OrderDate >= start_date)
+    if end_date is not None:
+        query = query.filter(model.Orders.OrderDate <= end_date)
+    return query.group_by(model.Orders.EmployeeID).order_by(revenue.desc())
+
+async def get_employee_performance(db: AsyncSession, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    return await _all_dicts(db, employee_performance_query(start_date, end_date))
+
+
+# Tạo hóa đơn: kiểm tra toàn bộ các dòng trước khi ghi, rồi ghi Orders + OrderDetails + bảng tổng hợp
+# doanh thu trong cùng một transaction (người gọi commit hoặc rollback)
+def validate_orders(db: Session, orders: List[schema.OrderCreate]):
+    # Trả về danh sách lỗi {"order": vị trí trong request, "ProductID", "detail"}; rỗng nếu hợp lệ
+    product_ids = {line.ProductID for order in orders for line in order.Products}
+    known = set(db.scalars(select(model.Product.ProductID).
+                           where(model.Product.ProductID.in_(product_ids)))) if product_ids else set()
+    errors = []
+    for index, order in enumerate(orders):
+        seen = set()
+        for line in order.Products:
+            if line.UnitPrice <= 0 or line.Quantity <= 0 or not 0 <= line.Discount < 1:
+                detail = "Invalid product data"
+            elif line.ProductID not in known:
+                detail = "Product not found"
+            elif line.ProductID in seen:
+                detail = "Duplicate ProductID in order"
+            else:
+                seen.add(line.ProductID)
+                continue
+            errors.append({"order": index, "ProductID": line.ProductID, "detail": detail})
+    return errors
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id: int, quantity: int):
+        super().__init__(f"Insufficient stock for ProductID {product_id} (requested {quantity})")
+        self.product_id = product_id
+        self.quantity = quantity
+
+def reserve_stock(db: Session, quantities: dict):
+    # Trừ kho bằng UPDATE có điều kiện: CSDL tự khóa dòng trong câu lệnh, không SELECT ... rồi ghi lại.
+    # Cập nhật theo thứ tự ProductID để các transaction đồng thời khóa cùng thứ tự, tránh deadlock.
+    # rowcount = 0 nghĩa là không đủ hàng (hoặc UnitsInStock NULL): raise để người gọi rollback.
+    stock = model.Product.UnitsInStock
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        result = db.execute(update(model.Product).
+                            where(model.Product.ProductID == product_id, stock >= quantity).
+                            values(UnitsInStock=stock - quantity).
+                            execution_options(synchronize_session=False))
+        if result.rowcount != 1:
+            raise InsufficientStock(product_id, quantity)
+
+def create_orders(db: Session, orders: List[schema.OrderCreate]):
+    # Một flush cho Orders để lấy OrderID, một executemany cho toàn bộ OrderDetails. Không commit.
+    quantities = defaultdict(int)
+    for order in orders:
+        for line in order.Products:
+            quantities[line.ProductID] += line.Quantity
+    reserve_stock(db, quantities)
+
+    db_orders = [model.Orders(**order.dict(exclude={"Products"})) for order in orders]
+    db.add_all(db_orders)
+    db.flush()
+
+    lines = []
+    revenue = defaultdict(float)
+    for db_order, order in zip(db_orders, orders):
+        for line in order.Products:
+            lines.append({"OrderID": db_order.OrderID, **line.dict()})
+            revenue[order.OrderDate.date()] += rollup.line_revenue(line)
+    if lines:
+        db.execute(insert(model.OrderDetails.__table__), lines)
+
+    # Cộng dồn doanh thu theo ngày: mỗi ngày / tháng / năm một lần upsert thay vì mỗi hóa đơn
+    rollup.add_revenue(db, revenue)
+    # UnitsInStock và doanh thu đã đổi: ETag / khóa cache của các endpoint tồn kho và /revenue/* đổi cùng commit.
+    # Câu lệnh cuối của transaction: các dòng phiên bản chỉ bị khóa từ đây tới commit
+    bump_table_versions(db, "orders", "products")
+    return db_orders
@@ -0,0 +1,36 @@
+# Trả JSON nhanh cho các endpoint đọc
+#
+# Khi endpoint trả về list/dict, FastAPI chạy jsonable_encoder và validate lại từng dòng theo response_model.
+# Các dòng lấy bằng select(...) trên bảng của chính ta đã đúng kiểu, nên endpoint trả FastJSONResponse:
+# ghi thẳng ra bytes bằng orjson (nếu có cài, không thì json chuẩn), response_model chỉ còn dùng cho tài liệu.
+import json
+
+from fastapi.responses import Response
+
+from main.streaming import json_default
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    # Decimal -> float, date/datetime -> ISO 8601, khóa int của dict -> chuỗi (giống json chuẩn)
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+async def adumps(compute):
+    # Dùng với ResultCache.aget_or_compute để cache luôn bytes đã mã hóa
+    return dumps(await compute())
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,185 @@
+# Nhập dữ liệu CSV theo lô (set-based) thay cho iterrows + SELECT từng dòng
+import time
+
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from main import model
+
+PRODUCT_COLUMNS = ['ProductName', 'SupplierID', 'CategoryID', 'QuantityPerUnit', 'UnitPrice',
+                   'UnitsInStock', 'UnitsOnOrder', 'ReorderLevel', 'Discontinued']
+PRODUCT_INT_COLUMNS = ['SupplierID', 'CategoryID', 'UnitsInStock', 'UnitsOnOrder', 'ReorderLevel']
+PRODUCT_NAME_LENGTH = model.Product.ProductName.type.length
+SHIPPER_COLUMNS = ['CompanyName', 'Phone']
+CUSTOMER_COLUMNS = ['CustomerID', 'CompanyName', 'ContactName', 'ContactTitle', 'Address',
+                    'City', 'PostalCode', 'Country', 'Phone', 'Fax']
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def reject(self, line_numbers, reason: str):
+        # Dòng trong file (tính cả dòng tiêu đề), chỉ giữ MAX_REPORTED_ERRORS thông báo đầu tiên
+        self.rejected += len(line_numbers)
+        for line in line_numbers[:MAX_REPORTED_ERRORS - len(self.errors)]:
+            self.errors.append(f"line {line}: {reason}")
+
+    def as_dict(self):
+        seconds = (self.finished or time.perf_counter()) - self.started
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "rejected": self.rejected,
+            "errors": list(self.errors),
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows / seconds, 1) if seconds > 0 else None,
+        }
+
+
+def _clean_product_chunk(chunk: pd.DataFrame):
+    # Trả về danh sách dict hợp lệ và số thứ tự các dòng bị loại (thiếu tên, tên quá dài, số không đọc được)
+    names = chunk['ProductName'].astype('string').str.strip()
+    valid = (names.notna() & (names.str.len() > 0) & (names.str.len() <= PRODUCT_NAME_LENGTH)).fillna(False)
+
+    numeric = {}
+    for column in PRODUCT_INT_COLUMNS + ['UnitPrice', 'Discontinued']:
+        parsed = pd.to_numeric(chunk[column], errors='coerce')
+        valid &= parsed.notna() | chunk[column].isna()
+        numeric[column] = parsed
+
+    mask = valid.to_numpy(dtype=bool)
+    quantity = chunk['QuantityPerUnit'].astype('string')[mask]
+    columns = {
+        'ProductName': names[mask].tolist(),
+        'QuantityPerUnit': [None if pd.isna(value) else str(value) for value in quantity],
+        'UnitPrice': [None if pd.isna(value) else float(value) for value in numeric['UnitPrice'][mask]],
+        'Discontinued': [None if pd.isna(value) else bool(value) for value in numeric['Discontinued'][mask]],
+    }
+    for column in PRODUCT_INT_COLUMNS:
+        columns[column] = [None if pd.isna(value) else int(value) for value in numeric[column][mask]]
+
+    records = [dict(zip(PRODUCT_COLUMNS, values)) for values in zip(*(columns[column] for column in PRODUCT_COLUMNS))]
+    return records, _line_numbers(chunk, ~mask)
+
+
+def _line_numbers(chunk: pd.DataFrame, mask):
+    return [int(index) + 2 for index in chunk.index[mask]]
+
+
+def _check_columns(chunk: pd.DataFrame, required):
+    missing_cols = set(required) - set(chunk.columns)
+    if missing_cols:
+        raise ValueError(f"Missing columns: {missing_cols}")
+
+
+def _none_if_na(frame: pd.DataFrame, columns):
+    return [dict(zip(columns, values)) for values in
+            frame[columns].astype(object).where(frame[columns].notna(), None).itertuples(index=False, name=None)]
+
+
+def import_products(db: Session, file, chunk_size: int = 5000, result: ImportResult = None):
+    """Nhập sản phẩm từ CSV: mỗi chunk một truy vấn IN để lọc trùng và một executemany để ghi.
+
+    Trùng lặp so theo ProductName không phân biệt hoa thường (giống collation mặc định của MySQL),
+    cả với dữ liệu đã có trong CSDL lẫn các dòng lặp lại trong file. Không commit.
+    """
+    result = result or ImportResult()
+    seen = set()
+    table = model.Product.__table__
+
+    for chunk in pd.read_csv(file, chunksize=chunk_size):
+        _check_columns(chunk, PRODUCT_COLUMNS)
+        result.rows += len(chunk)
+
+        records, rejected = _clean_product_chunk(chunk)
+        result.reject(rejected, "missing or invalid ProductName, or non-numeric value")
+
+        fresh = []
+        for record in records:
+            key = record['ProductName'].casefold()
+            if key in seen:
+                result.skipped += 1
+                continue
+            seen.add(key)
+            fresh.append(record)
+        if not fresh:
+            continue
+
+        existing = {name.casefold() for (name,) in
+                    db.query(model.Product.ProductName).
+                    filter(model.Product.ProductName.in_([record['ProductName'] for record in fresh]))}
+        to_insert = [record for record in fresh if record['ProductName'].casefold() not in existing]
+        result.skipped += len(fresh) - len(to_insert)
+
+        if to_insert:
+            db.execute(insert(table), to_insert)
+            result.inserted += len(to_insert)
+
+    return result
+
+
+def import_shippers(db: Session, file, chunk_size: int = 5000, result: ImportResult = None):
+    # Lọc trùng theo cặp (CompanyName, Phone) với CSDL và trong file. Không commit.
+    result = result or ImportResult()
+    seen = set()
+    table = model.Shipper.__table__
+
+    for chunk in pd.read_csv(file, chunksize=chunk_size, dtype={'Phone': str}):
+        _check_columns(chunk, SHIPPER_COLUMNS)
+        result.rows += len(chunk)
+
+        valid = chunk['CompanyName'].notna().to_numpy(dtype=bool)
+        result.reject(_line_numbers(chunk, ~valid), "missing CompanyName")
+
+        fresh = []
+        for record in _none_if_na(chunk[valid], SHIPPER_COLUMNS):
+            key = (record['CompanyName'], record['Phone'])
+            if key in seen:
+                result.skipped += 1
+                continue
+            seen.add(key)
+            fresh.append(record)
+        if not fresh:
+            continue
+
+        existing = {tuple(row) for row in
+                    db.query(model.Shipper.CompanyName, model.Shipper.Phone).
+                    filter(model.Shipper.CompanyName.in_({record['CompanyName'] for record in fresh}))}
+        to_insert = [record for record in fresh if (record['CompanyName'], record['Phone']) not in existing]
+        result.skipped += len(fresh) - len(to_insert)
+
+        if to_insert:
+            db.execute(insert(table), to_insert)
+            result.inserted += len(to_insert)
+
+    return result
+
+
+def import_customers(db: Session, file, chunk_size: int = 5000, result: ImportResult = None):
+    # Ghi toàn bộ các dòng, CustomerID trùng sẽ làm lỗi cả lần nhập. Không commit.
+    result = result or ImportResult()
+    table = model.Customer.__table__
+
+    for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str):
+        _check_columns(chunk, CUSTOMER_COLUMNS)
+        result.rows += len(chunk)
+
+        records = _none_if_na(chunk, CUSTOMER_COLUMNS)
+        if records:
+            db.execute(insert(table), records)
+            result.inserted += len(records)
+
+    return result
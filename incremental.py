@@ -0,0 +1,129 @@
+# Dữ liệu dẫn xuất trong bộ nhớ dựng từ các hóa đơn và nạp tăng dần theo mốc OrderID
+# (recommendations.CoPurchaseIndex, analytics.SalesCube)
+#
+# Dựng toàn bộ một lần, sau đó trong một luồng nền chỉ đọc các hóa đơn có OrderID lớn hơn mốc đã đọc và các
+# OrderID còn thiếu dưới mốc; request vẫn đọc bản hiện tại trong lúc này. Không cần numpy: main.py import được ngay.
+#
+# OrderID được cấp lúc INSERT, không phải lúc commit: một transaction dài (vd. /orders/bulk 5000 hóa đơn) có thể
+# commit sau một hóa đơn có OrderID lớn hơn. Vì vậy mỗi OrderID bị bỏ qua khi mốc tăng được ghi nhớ là "chờ" và
+# được đọc lại ở các lần làm mới sau cho tới khi xuất hiện, hoặc quá PENDING_TIMEOUT giây (coi như transaction đã
+# rollback, hoặc hóa đơn không có dòng nào).
+import threading
+import time
+from abc import ABC, abstractmethod
+
+# Chỉ nhớ OrderID chờ trong khoảng này dưới mốc (lớn hơn nhiều lần /orders/bulk tối đa)
+PENDING_WINDOW = 100_000
+PENDING_TIMEOUT = 600.0
+# Quá số khoảng này thì đọc lại một khoảng bao tất cả (dòng đã có được bỏ qua theo is_loaded)
+MAX_PENDING_RANGES = 50
+
+
+class IncrementalOrders(ABC):
+    # Lớp con cài apply(rows): bỏ qua hóa đơn is_loaded, thêm phần còn lại rồi gọi mark_loaded
+    load_batch_size = 50000
+
+    def __init__(self):
+        self.last_order_id = 0
+        self._pending = {}   # OrderID chờ -> thời điểm phát hiện
+        self._pending_lock = threading.Lock()
+        self.built_at = time.monotonic()
+
+    def load(self, rows, batch_size: int = None):
+        # rows (row[0] = OrderID) sắp theo OrderID; mỗi lô cắt ở ranh giới hóa đơn (apply bỏ qua hóa đơn đã có)
+        batch_size = batch_size or self.load_batch_size
+        batch = []
+        for row in rows:
+            if len(batch) >= batch_size and row[0] != batch[-1][0]:
+                self.apply(batch)
+                batch = []
+            batch.append(row)
+        if batch:
+            self.apply(batch)
+        self.built_at = time.monotonic()
+
+    @abstractmethod
+    def apply(self, rows):
+        ...
+
+    def is_loaded(self, order_id) -> bool:
+        return order_id <= self.last_order_id and order_id not in self._pending
+
+    def mark_loaded(self, order_ids):
+        now = time.monotonic()
+        order_ids = set(order_ids)
+        with self._pending_lock:
+            for order_id in order_ids:
+                self._pending.pop(order_id, None)
+            top = max(order_ids)
+            if top > self.last_order_id:
+                # Các OrderID bị vượt qua mà chưa thấy: có thể thuộc transaction chưa commit
+                for order_id in range(max(self.last_order_id, top - PENDING_WINDOW) + 1, top):
+                    if order_id not in order_ids:
+                        self._pending[order_id] = now
+                self.last_order_id = top
+            self._expire(now)
+
+    def _expire(self, now):
+        # Gọi khi đang giữ _pending_lock
+        low, deadline = self.last_order_id - PENDING_WINDOW, now - PENDING_TIMEOUT
+        expired = [order_id for order_id, seen_at in self._pending.items() if order_id <= low or seen_at < deadline]
+        for order_id in expired:
+            del self._pending[order_id]
+
+    def reload_after(self) -> int:
+        return self.last_order_id
+
+    def pending_ranges(self):
+        # Các khoảng [đầu, cuối] OrderID chờ, để đọc lại cùng các hóa đơn sau mốc
+        with self._pending_lock:
+            self._expire(time.monotonic())
+            pending = sorted(self._pending)
+        ranges = []
+        for order_id in pending:
+            if ranges and ranges[-1][1] == order_id - 1:
+                ranges[-1][1] = order_id
+            else:
+                ranges.append([order_id, order_id])
+        if len(ranges) > MAX_PENDING_RANGES:
+            ranges = [[ranges[0][0], ranges[-1][1]]]
+        return [tuple(item) for item in ranges]
+
+
+class IncrementalHolder:
+    # load_rows(after_order_id, pending_ranges): các dòng của hóa đơn có OrderID > after_order_id hoặc nằm trong
+    # một khoảng của pending_ranges (after_order_id None: toàn bộ)
+    def __init__(self, factory, name: str, max_age: float = 10.0):
+        self.factory = factory
+        self.name = name
+        self.max_age = max_age
+        self.current = None
+        self._build_lock = threading.Lock()
+        self._refreshing = threading.Event()
+
+    def is_stale(self) -> bool:
+        return self.current is None or time.monotonic() - self.current.built_at > self.max_age
+
+    def build(self, load_rows):
+        # Lần dựng đầu (toàn bộ lịch sử); các request đến cùng lúc chờ kết quả của một lần dựng
+        with self._build_lock:
+            if self.current is None:
+                current = self.factory()
+                current.load(load_rows(None, ()))
+                self.current = current
+            return self.current
+
+    def refresh_in_background(self, load_rows):
+        # Chỉ một luồng làm mới tại một thời điểm
+        if self._refreshing.is_set() or self.current is None:
+            return
+        self._refreshing.set()
+        current = self.current
+
+        def refresh():
+            try:
+                current.load(load_rows(current.reload_after(), current.pending_ranges()))
+            finally:
+                self._refreshing.clear()
+
+        threading.Thread(target=refresh, name=f"{self.name}-refresh", daemon=True).start()
@@ -0,0 +1,104 @@
+# Chạy các lần nhập CSV trong thread pool riêng, trả job ID ngay cho client
+#
+# Mỗi job dùng session riêng, commit/rollback trong thread của pool. Số job chạy đồng thời
+# bị giới hạn bởi max_workers, số job chờ bởi max_pending để import lớn không chiếm hết API.
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from main import request_metrics
+
+
+class ImportQueueFull(Exception):
+    pass
+
+
+class ImportJob:
+    def __init__(self, kind: str, filename: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.filename = filename
+        self.status = "queued"
+        self.error = None
+        from main.importers import ImportResult  # pandas chỉ được nạp khi có job nhập đầu tiên
+        self.result = ImportResult()
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.sql = None
+
+    def as_dict(self):
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.started_at is not None:
+            data.update(self.result.as_dict())
+        if self.sql is not None:
+            # Số truy vấn SQL của job: tăng theo số dòng CSV là dấu hiệu truy vấn từng dòng (N+1)
+            data.update({"sql_queries": self.sql.queries, "sql_ms": round(self.sql.sql_seconds * 1000, 1)})
+        return data
+
+
+class ImportJobManager:
+    def __init__(self, session_factory, max_workers: int = 2, max_pending: int = 8, keep_finished: int = 100):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="import-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, filename: str, task) -> ImportJob:
+        # task(db, result) ghi dữ liệu và tự commit; lỗi sẽ được rollback và ghi vào job.error
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+            if active >= self.max_workers + self.max_pending:
+                raise ImportQueueFull(f"Too many import jobs in progress ({active})")
+            job = ImportJob(kind, filename)
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, task)
+        return job
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def _run(self, job: ImportJob, task):
+        job.status = "running"
+        job.started_at = time.time()
+        job.result.started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            with request_metrics.track() as job.sql:
+                task(db, job.result)
+            job.status = "succeeded"
+        except Exception as e:
+            db.rollback()
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            db.close()
+            job.result.finish()
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("succeeded", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,19 +1,69 @@
+import asyncio
+import base64
+import io
+import json
+import math
+import os
+import sys
+import time
 import traceback
+from contextlib import asynccontextmanager
+from datetime import date, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import List
-from webbrowser import get
-from fastapi import FastAPI, Depends, HTTPException, Query, status, UploadFile
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request, Response, status, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from enum import Enum
-import pandas as pd
-import numpy as np
 # import pymysql  # hoặc import mysqlclient
-
-from main import model, schema
-from .database import SessionLocal, engine
-model.Base.metadata.create_all(bind=engine)
-
-app  = FastAPI()
+# pandas chỉ được nạp khi nhập CSV (importers.py), không nạp lúc khởi động worker
+
+from main import crud, model, pool_metrics, request_metrics, rollup, schema
+from .cache import NullCache, ResultCache
+from .single_flight import NullFlight, SingleFlight, cached
+from .fast_json import FastJSONResponse, adumps
+from .jobs import ImportJobManager, ImportQueueFull
+from .search_index import ProductIndexHolder
+from .streaming import StreamFormat, streaming_response
+from .database import (REPLICA_DATABASE_URLS, AsyncSessionLocal, SessionLocal, async_engine, engine, env_bool,
+                       read_session_factory, replica_engines)
+
+# Khởi động: không tạo bảng khi import module (dùng alembic, hoặc DB_CREATE_ALL=1 để create_all lúc startup),
+# mở sẵn DB_POOL_WARM kết nối cho mỗi pool trước khi nhận request
+CREATE_ALL_ON_STARTUP = env_bool("DB_CREATE_ALL", False)
+POOL_WARM_CONNECTIONS = int(os.environ.get("DB_POOL_WARM", "2"))
+
+# Nén gzip các response lớn hơn RESPONSE_GZIP_MIN_SIZE byte khi client gửi Accept-Encoding: gzip (0 = tắt).
+# Mức nén mặc định 1: mức 9 của Starlette tốn ~25 ms cho 200 KB (/revenue/daily) mà chỉ nhỏ hơn ~20%
+GZIP_MIN_SIZE = int(os.environ.get("RESPONSE_GZIP_MIN_SIZE", "4096"))
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "1"))
+
+router = APIRouter()
+
+# Cache kết quả cho /revenue, /product/stock và /inventory, xóa theo tag khi có ghi dữ liệu.
+# Cache riêng từng tiến trình: lệnh ghi chỉ xóa cache của worker xử lý nó, các worker uvicorn khác vẫn có thể
+# trả dữ liệu cũ tới RESULT_CACHE_TTL giây (/product/stock thì không: khóa cache kèm ETag). Cần dữ liệu mới hơn
+# thì giảm RESULT_CACHE_TTL (0 = tắt cache) hoặc chạy một worker
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "60"))
+result_cache = ResultCache(max_entries=256, ttl=RESULT_CACHE_TTL)
+# Khi cache trống, các request đồng thời giống nhau dùng chung một truy vấn đang chạy (single_flight.py).
+# READ_COALESCING=0 để tắt
+READ_COALESCING = env_bool("READ_COALESCING", True)
+revenue_flight = SingleFlight("revenue")
+stock_flight = SingleFlight("stock")
+
+# Tối đa 2 job nhập CSV chạy cùng lúc, 8 job chờ; vượt quá thì trả 429. Mỗi app (create_app) tạo và đóng
+# thread pool của mình trong lifespan (app.state.import_jobs)
+IMPORT_MAX_WORKERS = 2
+IMPORT_MAX_PENDING = 8
+
+# Chỉ mục tên sản phẩm, dựng lại khi phiên bản "product_names" đổi (nhập sản phẩm) hoặc sau 5 phút
+product_index = ProductIndexHolder(max_age=300)
 
 # Dependency
 def get_db():
@@ -23,209 +73,498 @@ def get_db():
     finally:
         db.close()
 
+# Session bất đồng bộ cho các endpoint đọc: nhiều truy vấn chậm có thể chờ cùng lúc trên một worker.
+# Đọc xoay vòng trên các replica (REPLICA_DATABASE_URLS); client vừa ghi thành công được ghim vào primary
+# trong READ_AFTER_WRITE_PIN_SECONDS giây (cookie) để thấy ngay dữ liệu mình vừa ghi. Ghi luôn dùng primary.
+READ_AFTER_WRITE_PIN_SECONDS = float(os.environ.get("READ_AFTER_WRITE_PIN_SECONDS", "5"))
+PIN_COOKIE = "read_primary_until"
+
+def pinned_to_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_sessions(pinned: bool = Depends(pinned_to_primary)):
+    return AsyncSessionLocal if pinned else read_session_factory()
+
+async def get_read_db(sessions=Depends(read_sessions)):
+    async with sessions() as db:
+        yield db
+
+def read_cache(pinned: bool = Depends(pinned_to_primary)):
+    # Kết quả trong cache có thể được tính từ replica còn trễ: client đang ghim thì bỏ qua cache
+    return NullCache() if pinned else result_cache
+
+def read_flight(flight: SingleFlight, pinned: bool):
+    # Client đang ghim đọc primary: không nhận kết quả của truy vấn bắt đầu trước lệnh ghi của chính nó
+    return NullFlight() if pinned or not READ_COALESCING else flight
+
+async def with_read_session(sessions, compute):
+    # Session riêng cho truy vấn được gộp: nó có thể chạy lâu hơn request của leader
+    async with sessions() as db:
+        return await compute(db)
+
+def pin_reads_to_primary(response: Response):
+    # Dùng trong dependencies của endpoint ghi; không áp dụng khi endpoint lỗi (HTTPException)
+    if REPLICA_DATABASE_URLS and READ_AFTER_WRITE_PIN_SECONDS > 0:
+        response.set_cookie(PIN_COOKIE, f"{time.time() + READ_AFTER_WRITE_PIN_SECONDS:.3f}",
+                            max_age=math.ceil(READ_AFTER_WRITE_PIN_SECONDS), httponly=True, samesite="lax")
+
+# GET có điều kiện: ETag / Last-Modified theo phiên bản các bảng (model.TableVersion), endpoint ghi tăng phiên bản
+# trong cùng transaction (crud.bump_table_versions). Client gửi lại If-None-Match / If-Modified-Since thì trả 304
+# chỉ sau một truy vấn khóa chính nhỏ, không chạy truy vấn dữ liệu và không serialize. Phiên bản đọc trên cùng
+# CSDL (replica hoặc primary) với dữ liệu và trước dữ liệu, nên nội dung trả về không cũ hơn ETag. Session riêng,
+# đóng ngay sau truy vấn: request không giữ hai kết nối cùng lúc (pool cạn thì các request chờ lẫn nhau).
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # So sánh yếu (bỏ tiền tố W/), header có thể chứa nhiều ETag hoặc *
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in if_none_match.split(","))
+
+def not_modified(request: Request, etag: str, last_modified) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    # If-Modified-Since chỉ chính xác tới giây: hai lần ghi trong cùng một giây không phân biệt được, nên ưu tiên ETag
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return last_modified <= parsedate_to_datetime(if_modified_since).astimezone(timezone.utc)
+    except (TypeError, ValueError):
+        return False
+
+async def read_table_versions(sessions, tables):
+    # {bảng: (Version, UpdatedAt)}; bảng chưa từng được ghi qua API: (0, None)
+    async with sessions() as db:
+        versions = {name: (version, updated_at)
+                    for name, version, updated_at in await db.execute(crud.table_versions_query(list(tables)))}
+    return {table: versions.get(table, (0, None)) for table in tables}
+
+def conditional_get(*tables: str):
+    # Phiên bản đọc được để lại trong request.state.table_versions cho endpoint (vd. so với chỉ mục trong bộ nhớ)
+    async def validators(request: Request, sessions=Depends(read_sessions)):
+        versions = request.state.table_versions = await read_table_versions(sessions, tables)
+        parts = []
+        for table in tables:
+            version, updated_at = versions[table]
+            # Kèm thời điểm ghi: CSDL được tạo lại (phiên bản đếm lại từ 1) không trùng ETag cũ
+            parts.append(f"{table}.{version}.{int(updated_at.timestamp()) if updated_at else 0}")
+        headers = {"ETag": 'W/"' + "-".join(parts) + '"', "Cache-Control": "no-cache"}
+        modified = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+        last_modified = max(modified).replace(tzinfo=timezone.utc) if modified else None
+        if last_modified is not None:
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+        if not_modified(request, headers["ETag"], last_modified):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return headers
+    return validators
+
+def cache_versions(*tables: str):
+    # Phiên bản các bảng làm một phần khóa cache (như ETag của /product/stock). Đọc trên cùng CSDL và trước dữ
+    # liệu: replica còn trễ cho phiên bản cũ nên kết quả cũ chỉ nằm dưới khóa cũ, và lệnh ghi ở worker khác
+    # (phiên bản mới) không bao giờ trúng kết quả đã cache trước nó. Client đang ghim bỏ qua cache: không cần đọc
+    async def versions(sessions=Depends(read_sessions), pinned: bool = Depends(pinned_to_primary)):
+        if pinned:
+            return ()
+        current = await read_table_versions(sessions, tables)
+        return tuple(current[table] for table in tables)
+    return versions
+
 
 # Phương thức GET
 # 1. Tìm kiếm sản phẩm theo tên
-@app.get("/products/search", description = 'Search product details by name')
-def search_product(product_name: str = Query(default=None, max_length=40), db: Session = Depends(get_db)):
+# Tra chỉ mục trong bộ nhớ (search_index.py), chỉ đọc CSDL để lấy chi tiết các sản phẩm được trả về
+PRODUCT_NAME_QUERY = select(model.Product.ProductID, model.Product.ProductName).order_by(model.Product.ProductID)
 
-    result = db.query(model.Product).filter(model.Product.ProductName.ilike(f"%{product_name}%")).all()
-    names = np.array([row.ProductName for row in result])
-    return {"Quantity":names.size,"Name of products":names.tolist(), "Product details": result}
+def load_product_names():
+    db = SessionLocal()
+    try:
+        return db.execute(PRODUCT_NAME_QUERY).all()
+    finally:
+        db.close()
+
+async def get_product_index(version=None):
+    # version: phiên bản "product_names" conditional_get vừa đọc (nằm trong ETag); chỉ mục cũ hơn thì dựng lại
+    # trước khi trả, nên mọi worker trả cùng nội dung cho cùng ETag
+    index = product_index.index
+    if index is None or (version is not None and version != product_index.version):
+        return await run_in_threadpool(product_index.build, load_product_names, version)
+    if product_index.is_stale():
+        product_index.refresh_in_background(load_product_names)
+    return index
+
+@router.get("/products/search", description = 'Search product details by name')
+async def search_product(request: Request, product_name: str = Query(min_length=1, max_length=40),
+                         limit: int = Query(default=20, gt=0, le=200),
+                         db: AsyncSession = Depends(get_read_db),
+                         validators: dict = Depends(conditional_get("products", "product_names"))):
+    index = await get_product_index(request.state.table_versions["product_names"])
+    product_ids = index.search(product_name, limit)
+
+    details = {}
+    if product_ids:
+        query = crud.product_details_query(product_ids)
+        details = {row["ProductID"]: dict(row) for row in (await db.execute(query)).mappings()}
+    result = [details[product_id] for product_id in product_ids if product_id in details]
+    return FastJSONResponse({"Quantity": len(result), "Name of products": [row["ProductName"] for row in result],
+                             "Product details": result}, headers=validators)
+
+@router.get("/products/autocomplete", description = 'Product name prefix suggestions')
+async def autocomplete_product(request: Request, prefix: str = Query(min_length=1, max_length=40),
+                               limit: int = Query(default=10, gt=0, le=50),
+                               validators: dict = Depends(conditional_get("product_names"))):
+    index = await get_product_index(request.state.table_versions["product_names"])
+    return FastJSONResponse(index.autocomplete(prefix, limit), headers=validators)
 
 # 2. In chi tiết hóa đơn theo OrderID
-@app.get("/orderdetail", description='Get invoice information by OrderID')
-def info_invoice( db: Session = Depends(get_db), orderID: int = Query()):
- 
-    orderIDs = np.array(db.query(model.Orders.OrderID).all())
-    if orderID not in orderIDs:
-        raise HTTPException(status_code= 400, detail= f'OrderID not found. OrderID greater than {orderIDs[0]} and less than {orderIDs[-1]}')
-    
-    query = db.query(model.Product.ProductName,
-                     model.OrderDetails.Quantity, 
-                     model.OrderDetails.UnitPrice, 
-                     model.OrderDetails.Discount, 
-                     model.Orders.CustomerID, 
-                     model.Orders.OrderDate).\
-            join(model.OrderDetails, model.Product.ProductID == model.OrderDetails.ProductID).\
-            join(model.Orders, model.Orders.OrderID == model.OrderDetails.OrderID).\
-            filter(model.Orders.OrderID == orderID).all()
-    df = pd.DataFrame(query, columns=['ProductName', 'Quantity', 'UnitPrice','Discount','CustomerID', 'OrderDate'])
-    
-    total_order_value = (df['Quantity'] * df['UnitPrice'] * (1-df['Discount'])).sum()
-    
-    return {
-        "OrderDate": str(df['OrderDate'].iloc[0])[0:10],
-        "CustomerID": df['CustomerID'].iloc[0],
-        "Quantity": df.shape[0],
-        "Products": df.drop(["OrderDate","CustomerID"], axis = 'columns').to_dict(orient='records'),
-        "TotalOrderValue": total_order_value,
-    }
+def build_invoices(rows):
+    # Gom các dòng (đã sắp theo OrderID) thành hóa đơn, tổng tiền cộng dồn từ LineValue
+    invoices = {}
+    for row in rows:
+        invoice = invoices.get(row.OrderID)
+        if invoice is None:
+            invoice = invoices[row.OrderID] = {
+                "OrderDate": str(row.OrderDate)[0:10],
+                "CustomerID": row.CustomerID,
+                "Quantity": 0,
+                "Products": [],
+                "TotalOrderValue": 0.0,
+            }
+        invoice["Quantity"] += 1
+        invoice["Products"].append({"ProductName": row.ProductName,
+                                    "Quantity": row.Quantity,
+                                    "UnitPrice": row.UnitPrice,
+                                    "Discount": row.Discount})
+        invoice["TotalOrderValue"] += float(row.LineValue)
+    return invoices
+
+@router.get("/orderdetail", description='Get invoice information by OrderID')
+async def info_invoice( db: AsyncSession = Depends(get_read_db), orderID: int = Query()):
+
+    invoice = build_invoices(await crud.get_invoice_lines(db, [orderID])).get(orderID)
+    if invoice is None:
+        # Chỉ truy vấn MIN/MAX trên khóa chính khi không tìm thấy
+        first_id, last_id = await crud.get_orderID_range(db)
+        raise HTTPException(status_code= 400, detail= f'OrderID not found. OrderID greater than {first_id} and less than {last_id}')
+    return FastJSONResponse(invoice)
+
+# In nhiều hóa đơn trong một lần gọi
+MAX_BATCH_INVOICES = 1000
+
+@router.post("/orderdetail/batch", description='Get invoice information for many OrderIDs')
+async def info_invoice_batch(batch: schema.InvoiceBatchRequest, db: AsyncSession = Depends(get_read_db)):
+    order_ids = list(dict.fromkeys(batch.OrderIDs))
+    if not order_ids:
+        raise HTTPException(status_code=400, detail="OrderIDs must not be empty")
+    if len(order_ids) > MAX_BATCH_INVOICES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_INVOICES} OrderIDs per request")
+
+    invoices = build_invoices(await crud.get_invoice_lines(db, order_ids))
+    return FastJSONResponse({
+        "Invoices": invoices,
+        "NotFound": [order_id for order_id in order_ids if order_id not in invoices],
+    })
 
 
 # 3. Lấy doanh thu theo thời gian
-def get_daily_revenue(db: Session = Depends(get_db)):
-    query = """
-        SELECT O.OrderDate, SUM(OD.UnitPrice * OD.Quantity * (1 - OD.Discount)) AS DailyRevenue
-        FROM Orders AS O
-        JOIN OrderDetails AS OD ON O.OrderID = OD.OrderID
-        GROUP BY O.OrderDate
-        ORDER BY O.OrderDate;
-    """
+# Đọc từ bảng tổng hợp (rollup.py), không join + GROUP BY toàn bộ Orders/OrderDetails
+async def read_revenue_summary(db: AsyncSession, query):
     try:
-        result = pd.read_sql_query(query, db.bind)
-        # Định dạng chuẩn cho OrderDate
-        result['OrderDate'] = pd.to_datetime(result['OrderDate']).dt.date
-        return result.to_dict(orient='records')
+        return [dict(row._mapping) for row in await db.execute(query)]
     except Exception as e:
         print(f"Đã xuất hiện lỗi: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def get_monthly_revenue(db: Session = Depends(get_db)):
-    query = """
-        SELECT 
-            EXTRACT(MONTH FROM O.OrderDate) AS Month,
-            EXTRACT(YEAR FROM O.OrderDate) AS Year,
-            SUM(OD.UnitPrice * OD.Quantity * (1 - OD.Discount)) AS MonthlyRevenue
-        FROM Orders AS O
-        JOIN OrderDetails AS OD ON O.OrderID = OD.OrderID
-        GROUP BY Year, Month
-        ORDER BY Year, Month;
-    """
-    try:
-        result = pd.read_sql_query(query, db.bind)
-        # Chuyển đổi Month và Year thành kiểu int để tránh lỗi khi sử dụng chúng trong JSON
-        result['Month'] = result['Month'].astype(int)
-        result['Year'] = result['Year'].astype(int)
-        return result.to_dict(orient='records')
-    except Exception as e:
-        print(f"Đã xuất hiện lỗi: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_daily_revenue(db: AsyncSession):
+    return await read_revenue_summary(db, rollup.daily_summary_query())
+
+async def get_monthly_revenue(db: AsyncSession):
+    return await read_revenue_summary(db, rollup.monthly_summary_query())
     
-def get_yearly_revenue(db: Session = Depends(get_db)):
-    query = """
-        SELECT 
-            EXTRACT(YEAR FROM O.OrderDate) AS Year,
-            SUM(OD.UnitPrice * OD.Quantity * (1 - OD.Discount)) AS YearlyRevenue
-        FROM Orders AS O
-        JOIN OrderDetails AS OD ON O.OrderID = OD.OrderID
-        GROUP BY Year
-        ORDER BY Year;
-    """
-    try:
-        result = pd.read_sql_query(query, db.bind)
-        # Chuyển đổi Year thành kiểu int để tránh lỗi khi sử dụng chúng trong JSON
-        result['Year'] = result['Year'].astype(int)
-        
-        return result.to_dict(orient='records')
-    except Exception as e:
-        print(f"Đã xuất hiện lỗi: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_yearly_revenue(db: AsyncSession):
+    return await read_revenue_summary(db, rollup.yearly_summary_query())
 
-@app.get("/revenue/{time_period}")
-def get_revenue_by_period(time_period: str, db: Session = Depends(get_db)):
+@router.get("/revenue/{time_period}")
+async def get_revenue_by_period(time_period: str, sessions=Depends(read_sessions), cache=Depends(read_cache),
+                                pinned: bool = Depends(pinned_to_primary),
+                                versions: tuple = Depends(cache_versions("orders"))):
     if time_period == "daily":
-        return get_daily_revenue(db)
+        compute = get_daily_revenue
     elif time_period == "monthly":
-        return get_monthly_revenue(db)
+        compute = get_monthly_revenue
     elif time_period == "yearly":
-        return get_yearly_revenue(db)
+        compute = get_yearly_revenue
     else:
         raise HTTPException(status_code=400, detail="Invalid time period. Allowed values: daily, monthly, yearly")
+    # Cache bytes JSON đã mã hóa: cache hit không phải serialize lại; cache miss đồng thời chỉ chạy một truy vấn
+    body = await cached(cache, read_flight(revenue_flight, pinned), ("revenue", time_period, versions),
+                        lambda: adumps(lambda: with_read_session(sessions, compute)), tags=("revenue",))
+    return FastJSONResponse(body)
+
+# Doanh thu theo chiều bất kỳ (year, month, date, product, category, supplier, customer, country, employee)
+# từ cube dạng cột trong bộ nhớ (analytics.py, nạp numpy ở request đầu), không join lại các bảng.
+#   /analytics/revenue?group_by=category,year&filter=country:Germany|France&filter=year:1997
+SALES_CUBE_BATCH_SIZE = 100000
+
+def load_sales_facts(after_order_id, pending_ranges):
+    # Các khoảng OrderID chờ (tăng dần, dưới mốc) trước, rồi tới hóa đơn sau mốc: dòng luôn theo thứ tự OrderID
+    queries = [crud.sales_facts_query(order_id_range=order_id_range) for order_id_range in pending_ranges]
+    queries.append(crud.sales_facts_query(after_order_id))
+    db = SessionLocal()
+    try:
+        for query in queries:
+            yield from db.execute(query.execution_options(yield_per=SALES_CUBE_BATCH_SIZE))
+    finally:
+        db.close()
+
+async def get_incremental(holder, load_rows):
+    # holder: incremental.IncrementalHolder. Lần đầu dựng trong threadpool (request đồng thời chờ cùng một lần
+    # dựng); sau đó trả bản hiện tại và làm mới nền khi đã cũ
+    if holder.current is None:
+        return await run_in_threadpool(holder.build, load_rows)
+    if holder.is_stale():
+        holder.refresh_in_background(load_rows)
+    return holder.current
+
+async def get_sales_cube():
+    from main import analytics
+    return await get_incremental(analytics.holder, load_sales_facts)
+
+def record_sales(db: Session, order_ids):
+    # Thêm ngay các hóa đơn vừa ghi vào cube (nếu đã nạp); lỗi ở đây không làm hỏng request vì hóa đơn
+    # đã commit, lần làm mới định kỳ theo mốc OrderID sẽ đọc lại
+    analytics = sys.modules.get("main.analytics")
+    if analytics is None or analytics.holder.current is None:
+        return
+    try:
+        analytics.holder.current.apply(db.execute(crud.sales_facts_query(order_ids=order_ids)).all())
+    except Exception as e:
+        print(f"Đã xuất hiện lỗi: {e}")
+
+@router.get("/analytics/revenue", description='Revenue, quantity and line count grouped by any dimensions')
+async def get_analytics_revenue(group_by: str = Query(default="", description="comma separated dimensions"),
+                                filter: List[str] = Query(default=[], description="dimension:value1|value2"),
+                                start_date: date = Query(default=None), end_date: date = Query(default=None)):
+    from main import analytics
+    filters = {}
+    for item in filter:
+        dimension, separator, values = item.partition(":")
+        if not separator or not values:
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {item}. Expected dimension:value1|value2")
+        filters.setdefault(dimension, []).extend(values.split("|"))
+    dimensions = [dimension for dimension in group_by.split(",") if dimension]
+
+    cube = await get_sales_cube()
+    try:
+        result = await run_in_threadpool(cube.revenue, dimensions, filters, start_date, end_date)
+    except analytics.InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(result)
+
+@router.get("/analytics/stats", description='Rows, memory and dimension sizes of the in-memory sales cube')
+async def get_analytics_stats():
+    return (await get_sales_cube()).stats()
 
 
 # 4. Lấy sản phẩm trong kho
-# Tổng sản phẩm trong kho
-def calculate_total_stock(product_data):
-    total_stock = int(np.sum([product.get('UnitsInStock', 0) for product in product_data]))
-    return total_stock
-@app.get("/product/stock")
-def get_product_stock(db: Session = Depends(get_db)):
-    query = """
-        SELECT ProductID, ProductName, UnitsInStock FROM Products;
-    """
+# Tổng sản phẩm trong kho tính bằng SUM trong CSDL
+@router.get("/product/stock")
+async def get_product_stock(sessions=Depends(read_sessions), cache=Depends(read_cache),
+                            pinned: bool = Depends(pinned_to_primary),
+                            validators: dict = Depends(conditional_get("products"))):
+    # Khóa cache kèm ETag: worker khác ghi (phiên bản mới) thì không trả bytes cũ dưới ETag mới
+    body = await cached(cache, read_flight(stock_flight, pinned), ("stock", validators["ETag"]),
+                        lambda: adumps(lambda: with_read_session(sessions, compute_product_stock)), tags=("stock",))
+    return FastJSONResponse(body, headers=validators)
+
+async def compute_product_stock(db: AsyncSession):
     try:
-        df = pd.read_sql_query(query, db.bind)
-        # Sản phẩm tồn kho
-        product_data = df.to_dict('records')
-        # Tổng số sản phẩm còn lại
-        total_stock = calculate_total_stock(product_data)
+        # Sản phẩm tồn kho và tổng số sản phẩm còn lại
+        product_data = await crud.get_stock_products(db)
+        total_stock = await crud.get_total_stock(db)
 
         return {"Total_stock": total_stock, "Product": product_data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Tồn kho theo danh mục / nhà cung cấp và sản phẩm cần đặt hàng, phân trang keyset (token trong X-Next-Cursor)
+async def inventory_page(key: str, fetch, db: AsyncSession, cache, versions: tuple, cursor: str, limit: int):
+    after = decode_cursor(cursor) if cursor is not None else None
+    rows = await cache.aget_or_compute(("inventory", key, after, limit, versions),
+                                       lambda: fetch(db, after, limit), tags=("stock",))
+    headers = {}
+    if len(rows) == limit and rows[-1][key] is not None:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1][key])
+    return FastJSONResponse(rows, headers=headers)
+
+@router.get("/inventory/by-category", description='Stock totals grouped by category')
+async def get_stock_by_category(cursor: str = Query(default=None),
+                                limit: int = Query(default=50, gt=0, le=500),
+                                db: AsyncSession = Depends(get_read_db), cache=Depends(read_cache),
+                                versions: tuple = Depends(cache_versions("categories", "products"))):
+    return await inventory_page("CategoryID", crud.get_stock_by_category, db, cache, versions, cursor, limit)
+
+@router.get("/inventory/by-supplier", description='Stock totals grouped by supplier')
+async def get_stock_by_supplier(cursor: str = Query(default=None),
+                                limit: int = Query(default=50, gt=0, le=500),
+                                db: AsyncSession = Depends(get_read_db), cache=Depends(read_cache),
+                                versions: tuple = Depends(cache_versions("products", "suppliers"))):
+    return await inventory_page("SupplierID", crud.get_stock_by_supplier, db, cache, versions, cursor, limit)
+
+@router.get("/inventory/reorder", description='Active products at or below their ReorderLevel')
+async def get_reorder_products(cursor: str = Query(default=None),
+                               limit: int = Query(default=100, gt=0, le=1000),
+                               db: AsyncSession = Depends(get_read_db), cache=Depends(read_cache),
+                               versions: tuple = Depends(cache_versions("products"))):
+    return await inventory_page("ProductID", crud.get_reorder_products, db, cache, versions, cursor, limit)
+
 # 5. Danh sách hóa đơn theo EmployeeID
-@app.get("/employee-invoices/", response_model=List[schema.OrderDetails])
-def get_employee_invoices(employee_id: int, db: Session = Depends(get_db)):
-    # Sử dụng truy vấn SQL để lấy danh sách các hoá đơn của nhân viên
-    query = f"""
-    SELECT OD.*
-    FROM orderdetails OD
-    INNER JOIN orders O ON OD.OrderID = O.OrderID
-    WHERE O.EmployeeID = {employee_id}
-    """
-    
-    # Thực hiện truy vấn SQL và lấy kết quả
-    result = pd.read_sql_query(query, db.connection())
+# format=ndjson|csv trả dữ liệu dạng stream từ server-side cursor, không giữ toàn bộ kết quả trong bộ nhớ
+@router.get("/employee-invoices/", response_model=List[schema.OrderDetails])
+async def get_employee_invoices(employee_id: int, format: StreamFormat = StreamFormat.json,
+                                db: AsyncSession = Depends(get_read_db), sessions=Depends(read_sessions)):
+    # Truy vấn các dòng hoá đơn của nhân viên (lọc theo chỉ mục Orders.EmployeeID)
+    query = crud.employee_invoices_query(employee_id)
+    if format != StreamFormat.json:
+        return streaming_response(sessions, query, fmt=format, filename=f"employee-{employee_id}-invoices")
     
-    # Chuyển kết quả thành danh sách các bản ghi (records)
-    records = result.to_dict(orient='records')
+    # Thực hiện truy vấn SQL và chuyển kết quả thành danh sách các bản ghi (records)
+    result = await db.execute(query)
+    records = [dict(row) for row in result.mappings()]
     
-    return records
+    # Các dòng đã đúng schema.OrderDetails: ghi thẳng JSON, không validate lại theo response_model
+    return FastJSONResponse(records)
+
+# Xuất dòng hóa đơn (kèm sản phẩm, khách hàng) dạng Arrow IPC hoặc Parquet, giữ đúng kiểu cột, theo khoảng ngày.
+# Đọc từ server-side cursor theo lô, mỗi lô ghi ra một record batch / row group nên bộ nhớ không tăng theo số dòng
+@router.get("/orders/export", description='Stream order-line facts as an Arrow IPC stream or a Parquet file')
+async def export_order_facts(format: str = Query(default="parquet", pattern="^(arrow|parquet)$"),
+                             start_date: date = Query(default=None), end_date: date = Query(default=None),
+                             employee_id: int = Query(default=None), sessions=Depends(read_sessions)):
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    try:
+        from main import arrow_export
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Arrow/Parquet export requires pyarrow (pip install pyarrow)")
+    query = crud.order_facts_query(start_date, end_date, employee_id)
+    filename = "order-facts" + "".join(f"-{value}" for value in (start_date, end_date) if value)
+    return arrow_export.export_response(sessions, query, arrow_export.ExportFormat(format), filename=filename)
 
 # 6. Danh sách khách hàng
-@app.get("/customers/", response_model=List[schema.Customer])
-def read_od11(skip: int = 0, limit: int = 50, db: Session = Depends(get_db)):
-    items = db.query(model.Customer).offset(skip).limit(limit).all()
-    df = pd.DataFrame([item.__dict__ for item in items])
-    df["Fax"] = df["Fax"].fillna("N/A")
-    df["PostalCode"] = df["PostalCode"].fillna("N/A")
-    return df.to_dict(orient="records")
+# Phân trang keyset theo CustomerID: mỗi trang là một range scan trên khóa chính, token trang sau trả trong header
+def customer_record(row):
+    record = dict(row)
+    for column in ("Fax", "PostalCode"):
+        if record[column] is None:
+            record[column] = "N/A"
+    return record
+
+def encode_cursor(customer_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": customer_id}).encode()).decode()
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))["after"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/customers/", response_model=List[schema.Customer])
+async def read_od11(cursor: str = Query(default=None, description='Token from the X-Next-Cursor header of the previous page'),
+                    limit: int = Query(default=50, gt=0, le=1000),
+                    skip: int = Query(default=0, ge=0, deprecated=True),
+                    db: AsyncSession = Depends(get_read_db),
+                    validators: dict = Depends(conditional_get("customers"))):
+    after = decode_cursor(cursor) if cursor is not None else None
+    query = crud.customers_page_query(after, limit, skip)
+
+    records = [customer_record(row) for row in (await db.execute(query)).mappings()]
+    headers = dict(validators)
+    if len(records) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(records[-1]["CustomerID"])
+    return FastJSONResponse(records, headers=headers)
+
+# Xuất toàn bộ khách hàng dạng NDJSON/CSV từ server-side cursor, bộ nhớ không phụ thuộc số dòng
+@router.get("/customers/export", description='Stream every customer as NDJSON or CSV')
+async def export_customers(format: StreamFormat = StreamFormat.ndjson, sessions=Depends(read_sessions)):
+    if format == StreamFormat.json:
+        raise HTTPException(status_code=400, detail="Allowed formats: ndjson, csv")
+    query = select(*model.Customer.__table__.columns).order_by(model.Customer.CustomerID)
+    return streaming_response(sessions, query, fmt=format, transform=customer_record, filename="customers")
 
 # 7. Danh sách khách hàng đã mua sản phẩm theo ProductID
-@app.get("/product-customers/", response_model=List[schema.Customer])
-def get_product_customers(product_id: int, db: Session = Depends(get_db)):
-    # Sử dụng truy vấn SQL để lấy danh sách các khách hàng đã mua sản phẩm dựa trên mã sản phẩm
-    query = f"""
-    SELECT C.*
-    FROM customers C
-    INNER JOIN orders O ON C.CustomerID = O.CustomerID
-    INNER JOIN orderdetails OD ON O.OrderID = OD.OrderID
-    WHERE OD.ProductID = {product_id}
-    """
-    
-    # Thực hiện truy vấn SQL và lấy kết quả
-    result = pd.read_sql_query(query, db.connection())
+@router.get("/product-customers/", response_model=List[schema.Customer])
+async def get_product_customers(product_id: int, format: StreamFormat = StreamFormat.json,
+                                db: AsyncSession = Depends(get_read_db), sessions=Depends(read_sessions)):
+    # Truy vấn các khách hàng đã mua sản phẩm (lọc theo chỉ mục OrderDetails.ProductID)
+    query = crud.product_customers_query(product_id)
+    if format != StreamFormat.json:
+        return streaming_response(sessions, query, fmt=format, transform=customer_record,
+                                  filename=f"product-{product_id}-customers")
     
-    # Chuyển kết quả thành danh sách các bản ghi (records)
-    records = result.to_dict(orient='records')
+    # Thực hiện truy vấn SQL và chuyển kết quả thành danh sách các bản ghi (records)
+    result = await db.execute(query)
+    records = [customer_record(row) for row in result.mappings()]
     
-    return records
+    return FastJSONResponse(records)
+
+# Gợi ý "khách mua sản phẩm này cũng mua" và khách hàng tương tự từ ma trận đồng mua trong bộ nhớ
+# (recommendations.py, nạp numpy/scipy ở request đầu). Sau lần dựng đầu chỉ đọc thêm các hóa đơn mới.
+CO_PURCHASE_BATCH_SIZE = 50000
+
+def load_order_lines(after_order_id, pending_ranges):
+    # Như load_sales_facts: khoảng OrderID chờ trước, hóa đơn sau mốc sau
+    queries = [crud.co_purchase_lines_query(order_id_range=order_id_range) for order_id_range in pending_ranges]
+    queries.append(crud.co_purchase_lines_query(after_order_id))
+    db = SessionLocal()
+    try:
+        for query in queries:
+            yield from db.execute(query.execution_options(yield_per=CO_PURCHASE_BATCH_SIZE))
+    finally:
+        db.close()
+
+async def get_co_purchase_index():
+    from main import recommendations
+    return await get_incremental(recommendations.holder, load_order_lines)
+
+@router.get("/products/also-bought", description='Products most often bought in the same order as a product')
+async def get_also_bought(product_id: int, limit: int = Query(default=10, gt=0, le=100)):
+    index = await get_co_purchase_index()
+    names = (await get_product_index()).names
+    items = index.also_bought(product_id, limit)
+    for item in items:
+        item["ProductName"] = names.get(item["ProductID"])
+    return FastJSONResponse(items)
+
+@router.get("/customers/similar", description='Customers with the most similar purchase history (cosine)')
+async def get_similar_customers(customer_id: str = Query(min_length=1, max_length=5),
+                                limit: int = Query(default=10, gt=0, le=100)):
+    index = await get_co_purchase_index()
+    return FastJSONResponse(index.similar_customers(customer_id, limit))
 
 # 8. Đếm số lượng hóa đơn của 1 nhân viên
-@app.get("/employee-invoice-count/")
-def get_employee_invoice_count(employee_id: int, db: Session = Depends(get_db)):
-    # Sử dụng truy vấn SQL để đếm số lượng hoá đơn của nhân viên dựa trên mã nhân viên
-    query = f"""
-    SELECT EmployeeID, OrderID
-    FROM orders
-    WHERE EmployeeID = {employee_id}
-    """
-    
-    # Thực hiện truy vấn SQL và lấy kết quả
-    result = pd.read_sql_query(query, db.connection())
-    
-    # Lấy số lượng hoá đơn từ kết quả truy vấn
-    invoice_count = np.array([result["OrderID"]]).size
+@router.get("/employee-invoice-count/")
+async def get_employee_invoice_count(employee_id: int, db: AsyncSession = Depends(get_read_db)):
+    # Đếm trực tiếp bằng COUNT trong CSDL
+    invoice_count = (await db.execute(crud.employee_invoice_count_query(employee_id))).scalar_one()
     
     # Trả về kết quả dưới dạng JSON
     return {"employee_id": employee_id, "invoice_count": invoice_count}
 
+# 9. Hiệu suất của tất cả nhân viên: số đơn, doanh thu, giá trị đơn trung bình trong khoảng thời gian
+@router.get("/employee-performance/", description='Order count, revenue and average order value per employee')
+async def get_employee_performance(start_date: date = Query(default=None), end_date: date = Query(default=None),
+                                   db: AsyncSession = Depends(get_read_db)):
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    return FastJSONResponse(await crud.get_employee_performance(db, start_date, end_date))
+
 
 # Phương thức POST
 # 1. Thêm danh mục sản phẩm
-@app.post("/category", description='Add categories')
+@router.post("/category", description='Add categories', dependencies=[Depends(pin_reads_to_primary)])
 def create_category(cate: schema.CategoryCreate, db: Session = Depends(get_db)):
     if not cate.CategoryName or not cate.Description:
         raise HTTPException(status_code=400, detail="All fields must be provided")
@@ -236,11 +575,13 @@ def create_category(cate: schema.CategoryCreate, db: Session = Depends(get_db)):
     
     db_cate = model.Category(CategoryName = cate.CategoryName, Description = cate.Description)
     if len(db_cate.CategoryName) > 15:
-        db_cate.CategoryName = np.where(len(db_cate.CategoryName) > 15, db_cate.CategoryName[:15], db_cate.CategoryName)
+        db_cate.CategoryName = db_cate.CategoryName[:15]
 
     try:
         db.add(db_cate)
+        crud.bump_table_versions(db, "categories")
         db.commit()
+        result_cache.invalidate("stock")
         # Làm mới đối tượng để lấy thông tin đã được lưu vào cơ sở dữ liệu
         db.refresh(db_cate)
         return db_cate
@@ -250,114 +591,80 @@ def create_category(cate: schema.CategoryCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Failed to create category: {str(e)}")
 
 
-# 2. Thêm shipper
-@app.post("/Shipper/upload-data", description = 'Add shipper from file_csv')
-async def upload_csv_shippers_file(file: UploadFile, db: Session = Depends(get_db)):
+# Nhập CSV chạy nền: endpoint trả job ID ngay, đọc và ghi CSDL trong thread pool của import_jobs
+def get_import_jobs(request: Request) -> ImportJobManager:
+    return request.app.state.import_jobs
+
+async def submit_import(import_jobs: ImportJobManager, kind: str, file: UploadFile, task):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File is not a CSV")
-    
-    df = pd.read_csv(file.file)
+    data = io.BytesIO(await file.read())
+    try:
+        job = import_jobs.submit(kind, file.filename, lambda db, result: task(db, data, result))
+    except ImportQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job.id, "status": job.status, "status_url": f"/imports/{job.id}"}
 
-    shippers = []
-    # iterrows chạy theo chỉ số dòng và dữ liệu dòng
-    for index, row in df.iterrows():
-        csv_CompanyName = row['CompanyName']
-        csv_Phone = row['Phone']
-        exist_Shipper = db.query(model.Shipper).filter(model.Shipper.CompanyName == csv_CompanyName, model.Shipper.Phone == csv_Phone).first()
-        if exist_Shipper is None:
-            shipper = model.Shipper(CompanyName=csv_CompanyName, Phone=csv_Phone)
-            shippers.append(shipper)
 
-    if shippers == []:
-        raise HTTPException(status_code=400, detail="Data already exists or the file does not have matching data")
+# 2. Thêm shipper
+@router.post("/Shipper/upload-data", description = 'Add shipper from file_csv', status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(pin_reads_to_primary)])
+async def upload_csv_shippers_file(file: UploadFile, import_jobs: ImportJobManager = Depends(get_import_jobs)):
+    def task(db: Session, data, result):
+        from main import importers
+        importers.import_shippers(db, data, result=result)
+        if result.inserted == 0:
+            raise ValueError("Data already exists or the file does not have matching data")
+        crud.bump_table_versions(db, "shippers")
+        db.commit()
 
-    db.add_all(shippers)
-    db.commit()
-    return "CSV file uploaded and shippers added successfully"
+    return await submit_import(import_jobs, "shippers", file, task)
 
 
 # 3. Thêm sản phẩm
-@app.post("/products/upload-data", description = "Upload CSV file to import customers")
-async def upload_csv_products_file(file: UploadFile, db: Session = Depends(get_db)):
-    # Kiểm tra định dạng file
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="File is not a CSV")
-    try:
-        df = pd.read_csv(file.file)
-
-        products = []
-        for idx, row in df.iterrows():
-            csv_ProductName = row['ProductName']
-            csv_SupplierID = row['SupplierID']
-            csv_CategoryID = row['CategoryID']
-            csv_QuantityPerUnit = row['QuantityPerUnit']
-            csv_UnitPrice = row['UnitPrice']
-            csv_UnitsInStock = row['UnitsInStock']
-            csv_UnitsOnOrder = row['UnitsOnOrder']
-            csv_ReorderLevel = row['ReorderLevel']
-            csv_Discontinued = row['Discontinued']
-            exist_Product = db.query(model.Product).filter(model.Product.ProductName == csv_ProductName).first()
-                                                        #    model.Product.SupplierID == csv_SupplierID,
-                                                        #    model.Product.CategoryID == csv_CategoryID,
-                                                        #    model.Product.QuantityPerUnit == csv_QuantityPerUnit,
-                                                        #    model.Product.UnitPrice == csv_UnitPrice,
-                                                        #    model.Product.UnitsInStock == csv_UnitsInStock,
-                                                        #    model.Product.UnitsOnOrder == csv_UnitsOnOrder,
-                                                        #    model.Product.ReorderLevel == csv_ReorderLevel,
-                                                        #    model.Product.Discontinued == csv_Discontinued).
-            if exist_Product is None:
-                product = model.Product(ProductName = csv_ProductName,
-                                        SupplierID = csv_SupplierID,
-                                        CategoryID = csv_CategoryID,
-                                        QuantityPerUnit = csv_QuantityPerUnit,
-                                        UnitPrice = csv_UnitPrice,
-                                        UnitsInStock = csv_UnitsInStock,
-                                        UnitsOnOrder = csv_UnitsOnOrder,
-                                        ReorderLevel = csv_ReorderLevel,
-                                        Discontinued = csv_Discontinued)
-                products.append(product)
-        
-        if products == [] : # Nếu không có sản phẩm được khởi tạo trả về lỗi người dùng : 400
-            raise HTTPException(status_code=400, detail="Data already exists or the file does not have matching data")
-        
-        db.add_all(products)
+@router.post("/products/upload-data", description = "Upload CSV file to import products", status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(pin_reads_to_primary)])
+async def upload_csv_products_file(file: UploadFile, chunk_size: int = Query(default=5000, gt=0, le=50000),
+                                   import_jobs: ImportJobManager = Depends(get_import_jobs)):
+    def task(db: Session, data, result):
+        from main import importers
+        # Đọc theo chunk, lọc trùng bằng một truy vấn IN và ghi bằng executemany cho mỗi chunk
+        importers.import_products(db, data, chunk_size=chunk_size, result=result)
+        if result.inserted == 0: # Nếu không có sản phẩm được khởi tạo thì job thất bại
+            raise ValueError("Data already exists or the file does not have matching data")
+        # product_names: chỉ mục tìm kiếm ở mọi worker dựng lại ở request kế tiếp (hóa đơn chỉ tăng "products")
+        crud.bump_table_versions(db, "products", "product_names")
         db.commit()
+        result_cache.invalidate("stock")
 
-        return "CSV file uploaded success"
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+    return await submit_import(import_jobs, "products", file, task)
 
 # 4. Thêm khách hàng
-@app.post("/customers/upload-data", description="Upload CSV file to import customers")
-async def upload_csv_to_customers(file: UploadFile , db: Session = Depends(get_db)):
-    # Kiểm tra định dạng file
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="File is not a CSV")
-
-    try:
-        df = pd.read_csv(file.file)
-        # Kiểm tra các cột xem tồn tại không
-        required_columns = {'CustomerID', 'CompanyName', 'ContactName', 'ContactTitle', 'Address', 'City', 'PostalCode', 'Country', 'Phone', 'Fax'}
-        if not required_columns.issubset(df.columns): 
-            missing_cols = required_columns - set(df.columns)
-            raise HTTPException(status_code=422, detail=f"Missing columns: {missing_cols}")
-
-        customer_dicts = df.to_dict(orient='records')
-        
-        # Sử dụng unpacking(**) để tạo danh sách  
-        customers = [model.Customer(**data) for data in customer_dicts]
-        
-        db.add_all(customers)
+@router.post("/customers/upload-data", description="Upload CSV file to import customers", status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(pin_reads_to_primary)])
+async def upload_csv_to_customers(file: UploadFile, import_jobs: ImportJobManager = Depends(get_import_jobs)):
+    def task(db: Session, data, result):
+        from main import importers
+        importers.import_customers(db, data, result=result)
+        crud.bump_table_versions(db, "customers")
         db.commit()
 
-        return {"message": "Added customers successfully!", "count": len(customers)}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+    return await submit_import(import_jobs, "customers", file, task)
+
+# Trạng thái các job nhập CSV
+@router.get("/imports", description='List CSV import jobs')
+def list_import_jobs(import_jobs: ImportJobManager = Depends(get_import_jobs)):
+    return [job.as_dict() for job in import_jobs.list()]
+
+@router.get("/imports/{job_id}", description='Get progress of a CSV import job')
+def get_import_job(job_id: str, import_jobs: ImportJobManager = Depends(get_import_jobs)):
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.as_dict()
 
 # 5. Thêm nhà cung cấp
-@app.post("/supplier")
+@router.post("/supplier", dependencies=[Depends(pin_reads_to_primary)])
 def create_supplier(sup: schema.SupplierCreate, db: Session = Depends(get_db)):
     existing_supplier = db.query(model.Supplier).filter(
         model.Supplier.CompanyName == sup.CompanyName,
@@ -369,13 +676,13 @@ def create_supplier(sup: schema.SupplierCreate, db: Session = Depends(get_db)):
     if existing_supplier:
         raise HTTPException(status_code=400, detail="This supplier already exists in the database.")
     
-    df = pd.DataFrame.from_dict(sup.dict(), orient='index').T
-    if (df['PostalCode'].str.len() > 10).any():
+    if sup.PostalCode is not None and len(sup.PostalCode) > 10:
         raise HTTPException(status_code=400, detail="PostalCode length limited to 10 characters.")
     
     try:
-        db_sup = df.to_dict(orient='records')[0]
+        db_sup = sup.dict()
         db.add(model.Supplier(**db_sup))
+        crud.bump_table_versions(db, "suppliers")
         db.commit()
         return {"Message":'Add supplier is successful', "Detail": db_sup}
     except Exception as e:
@@ -384,36 +691,123 @@ def create_supplier(sup: schema.SupplierCreate, db: Session = Depends(get_db)):
     
 
 # 6. Thêm hóa đơn
-@app.post("/orders/")
+# Kiểm tra mọi dòng trước khi ghi; trừ kho, hóa đơn và chi tiết được ghi trong một transaction.
+# Không đủ hàng cho một sản phẩm thì trả 409 và không ghi gì.
+MAX_BULK_ORDERS = 5000
+
+def save_orders(db: Session, orders: List[schema.OrderCreate]):
+    errors = crud.validate_orders(db, orders)
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+    try:
+        # Lấy OrderID trước commit: sau commit các đối tượng bị expire, đọc lại sẽ tốn một SELECT mỗi hóa đơn
+        order_ids = [db_order.OrderID for db_order in crud.create_orders(db, orders)]
+        db.commit()
+    except crud.InsufficientStock as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail={"ProductID": e.product_id, "detail": str(e)})
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to create order: {str(e)}")
+    result_cache.invalidate("revenue", "stock")
+    record_sales(db, order_ids)
+    return order_ids
+
+@router.post("/orders/", dependencies=[Depends(pin_reads_to_primary)])
 def create_order(order: schema.OrderCreate, db: Session = Depends(get_db)):
-    # Validate order data using NumPy
-    valid_order = np.all(order.OrderDate is not None)
-
-    if not valid_order:
-        raise HTTPException(status_code=400, detail="Invalid order data")
-
-    # Create a new order and add it to the database
-    db_order = model.Orders(**order.dict(exclude={"Products"}))
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-
-    # Create OrderDetails records for each product in the order
-    for product_data in order.Products:
-        valid_product_data = np.all(product_data.UnitPrice > 0) and np.all(product_data.Quantity > 0)
-        if not valid_product_data:
-            raise HTTPException(status_code=400, detail="Invalid product data")
-
-        db_order_detail = model.OrderDetails(
-            OrderID=db_order.OrderID,
-            ProductID=product_data.ProductID,
-            Quantity=product_data.Quantity,
-            UnitPrice=product_data.UnitPrice,
-            Discount=product_data.Discount
-        )
-        db.add(db_order_detail)
-
-    db.commit()
-    db.refresh(db_order)
-
-    return db_order      
\ No newline at end of file
+    order_id = save_orders(db, [order])[0]
+    return db.get(model.Orders, order_id)
+
+# Nhập nhiều hóa đơn một lần (đồng bộ từ POS): tất cả hoặc không hóa đơn nào được ghi
+@router.post("/orders/bulk", description=f'Create up to {MAX_BULK_ORDERS} orders in one transaction',
+             dependencies=[Depends(pin_reads_to_primary)])
+def create_orders_bulk(request: schema.OrderBulkCreate, db: Session = Depends(get_db)):
+    if not request.Orders:
+        raise HTTPException(status_code=400, detail="Orders must not be empty")
+    if len(request.Orders) > MAX_BULK_ORDERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ORDERS} orders per request")
+    order_ids = save_orders(db, request.Orders)
+    return {"inserted": len(order_ids), "OrderIDs": order_ids}
+
+
+# Thống kê cache
+@router.get("/cache/stats", description='Result cache hit, miss and eviction counters')
+def get_cache_stats():
+    return result_cache.stats()
+
+# Thống kê connection pool (sync và async)
+@router.get("/metrics/pool", description='Connection pool usage, wait time and checkout counters')
+def get_pool_metrics():
+    return pool_metrics.snapshot_all()
+
+# Số liệu Prometheus: request theo route, số truy vấn / thời gian SQL mỗi route, connection pool
+@router.get("/metrics", description='Prometheus metrics', response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    return PlainTextResponse(request_metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+# Kiểm tra sẵn sàng cho load balancer / orchestrator: 503 cho tới khi startup xong và CSDL trả lời được
+@router.get("/health/live", description='Process is up')
+def liveness():
+    return {"status": "ok"}
+
+@router.get("/health/ready", description='Startup finished and the database answers')
+async def readiness(request: Request):
+    if not getattr(request.app.state, "ready", False):
+        return FastJSONResponse({"status": "starting"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    try:
+        async with async_engine.connect() as connection:
+            await asyncio.wait_for(connection.execute(text("SELECT 1")), timeout=2)
+    except Exception as e:
+        return FastJSONResponse({"status": "database unavailable", "detail": str(e)},
+                                status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"status": "ready"}
+
+
+def warm_sync_pool(count: int):
+    connections = [engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.close()
+
+async def warm_pools(count: int):
+    # Mở sẵn count kết nối cho mỗi pool rồi trả lại, request đầu tiên không phải chờ handshake
+    if count <= 0:
+        return
+    connections = await asyncio.gather(*(async_engine.connect() for _ in range(count)))
+    for connection in connections:
+        await connection.close()
+    await run_in_threadpool(warm_sync_pool, count)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.import_jobs = ImportJobManager(SessionLocal, max_workers=IMPORT_MAX_WORKERS,
+                                             max_pending=IMPORT_MAX_PENDING)
+    if CREATE_ALL_ON_STARTUP:
+        await run_in_threadpool(model.Base.metadata.create_all, bind=engine)
+    try:
+        await warm_pools(POOL_WARM_CONNECTIONS)
+    except Exception as e:
+        # Vẫn khởi động; /health/ready trả 503 cho tới khi CSDL kết nối được
+        print(f"Không mở sẵn được kết nối CSDL: {e}")
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        app.state.import_jobs.shutdown()
+        await async_engine.dispose()
+        for replica_engine in replica_engines:
+            await replica_engine.dispose()
+        engine.dispose()
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+    if GZIP_MIN_SIZE > 0:
+        app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
+    # Thêm sau cùng nên bọc ngoài cùng: thời gian đo gồm cả nén gzip
+    app.add_middleware(request_metrics.RequestMetricsMiddleware)
+    app.include_router(router)
+    return app
+
+app = create_app()
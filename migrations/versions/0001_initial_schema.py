@@ -0,0 +1,124 @@
+"""initial schema
+
+Bảng Northwind thường đã có sẵn từ file dump; chỉ tạo các bảng còn thiếu
+(CSDL trống, hoặc các bảng tổng hợp doanh thu).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _missing(name):
+    return not sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if _missing('categories'):
+        op.create_table(
+            'categories',
+            sa.Column('CategoryID', sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column('CategoryName', sa.String(15)),
+            sa.Column('Description', sa.Text),
+        )
+    if _missing('suppliers'):
+        op.create_table(
+            'suppliers',
+            sa.Column('SupplierID', sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column('CompanyName', sa.String(40)),
+            sa.Column('ContactName', sa.String(30)),
+            sa.Column('ContactTitle', sa.String(30)),
+            sa.Column('Address', sa.String(60)),
+            sa.Column('City', sa.String(15)),
+            sa.Column('Region', sa.String(15)),
+            sa.Column('PostalCode', sa.String(10)),
+            sa.Column('Country', sa.String(15)),
+            sa.Column('Phone', sa.String(24)),
+            sa.Column('Fax', sa.String(24)),
+            sa.Column('HomePage', sa.Text),
+        )
+    if _missing('customers'):
+        op.create_table(
+            'customers',
+            sa.Column('CustomerID', sa.String(5), primary_key=True),
+            sa.Column('CompanyName', sa.String(40)),
+            sa.Column('ContactName', sa.String(30)),
+            sa.Column('ContactTitle', sa.String(30)),
+            sa.Column('Address', sa.String(60)),
+            sa.Column('City', sa.String(15)),
+            sa.Column('PostalCode', sa.String(10)),
+            sa.Column('Country', sa.String(15)),
+            sa.Column('Phone', sa.String(24)),
+            sa.Column('Fax', sa.String(24)),
+        )
+    if _missing('shippers'):
+        op.create_table(
+            'shippers',
+            sa.Column('ShipperID', sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column('CompanyName', sa.String(40)),
+            sa.Column('Phone', sa.String(24)),
+        )
+    if _missing('products'):
+        op.create_table(
+            'products',
+            sa.Column('ProductID', sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column('ProductName', sa.String(40)),
+            sa.Column('SupplierID', sa.Integer, sa.ForeignKey('suppliers.SupplierID')),
+            sa.Column('CategoryID', sa.Integer, sa.ForeignKey('categories.CategoryID')),
+            sa.Column('QuantityPerUnit', sa.String(20)),
+            sa.Column('UnitPrice', sa.Numeric(19, 4)),
+            sa.Column('UnitsInStock', sa.Integer),
+            sa.Column('UnitsOnOrder', sa.Integer),
+            sa.Column('ReorderLevel', sa.Integer),
+            sa.Column('Discontinued', sa.Boolean),
+        )
+    if _missing('orders'):
+        op.create_table(
+            'orders',
+            sa.Column('OrderID', sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column('CustomerID', sa.String(5), sa.ForeignKey('customers.CustomerID')),
+            sa.Column('EmployeeID', sa.Integer),
+            sa.Column('OrderDate', sa.Date),
+        )
+    if _missing('orderdetails'):
+        op.create_table(
+            'orderdetails',
+            sa.Column('OrderID', sa.Integer, sa.ForeignKey('orders.OrderID'), primary_key=True, index=True),
+            sa.Column('ProductID', sa.Integer, sa.ForeignKey('products.ProductID'), primary_key=True, index=True),
+            sa.Column('UnitPrice', sa.Float),
+            sa.Column('Quantity', sa.Integer),
+            sa.Column('Discount', sa.Float),
+        )
+    if _missing('revenue_daily'):
+        op.create_table(
+            'revenue_daily',
+            sa.Column('OrderDate', sa.Date, primary_key=True),
+            sa.Column('DailyRevenue', sa.Float(precision=53), nullable=False),
+        )
+    if _missing('revenue_monthly'):
+        op.create_table(
+            'revenue_monthly',
+            sa.Column('Year', sa.Integer, primary_key=True),
+            sa.Column('Month', sa.Integer, primary_key=True),
+            sa.Column('MonthlyRevenue', sa.Float(precision=53), nullable=False),
+        )
+    if _missing('revenue_yearly'):
+        op.create_table(
+            'revenue_yearly',
+            sa.Column('Year', sa.Integer, primary_key=True),
+            sa.Column('YearlyRevenue', sa.Float(precision=53), nullable=False),
+        )
+
+
+def downgrade():
+    # Không xóa các bảng Northwind gốc
+    op.drop_table('revenue_yearly')
+    op.drop_table('revenue_monthly')
+    op.drop_table('revenue_daily')
@@ -0,0 +1,42 @@
+"""secondary indexes for endpoint filters, joins and group-bys
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_orders_EmployeeID', 'orders', ['EmployeeID']),
+    ('ix_orders_OrderDate', 'orders', ['OrderDate']),
+    ('ix_orders_CustomerID', 'orders', ['CustomerID']),
+    ('ix_orderdetails_ProductID', 'orderdetails', ['ProductID']),
+    ('ix_products_ProductName', 'products', ['ProductName']),
+    ('ix_categories_CategoryName', 'categories', ['CategoryName']),
+    ('ix_products_category_stock', 'products', ['CategoryID', 'UnitsInStock', 'UnitsOnOrder', 'UnitPrice']),
+    ('ix_products_supplier_stock', 'products', ['SupplierID', 'UnitsInStock', 'UnitsOnOrder', 'UnitPrice']),
+    ('ix_products_reorder', 'products', ['Discontinued', 'ProductID', 'UnitsInStock', 'ReorderLevel']),
+]
+
+
+def _existing(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Bỏ qua chỉ mục đã có (CSDL tạo bằng create_all đã có sẵn các chỉ mục khai báo trong model.py)
+    for name, table, columns in INDEXES:
+        if name not in _existing(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        if name in _existing(table):
+            op.drop_index(name, table_name=table)
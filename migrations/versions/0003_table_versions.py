@@ -0,0 +1,27 @@
+"""table versions for ETag / Last-Modified on read endpoints
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('table_versions'):
+        op.create_table(
+            'table_versions',
+            sa.Column('TableName', sa.String(64), primary_key=True),
+            sa.Column('Version', sa.Integer, nullable=False),
+            sa.Column('UpdatedAt', sa.DateTime, nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table('table_versions')
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column,Date, Float, ForeignKey, Integer, LargeBinary, String, Numeric, Text
+from sqlalchemy import Boolean, Column,Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Numeric, Text
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -8,7 +8,7 @@ class Product(Base):
     __tablename__ = 'products'
 
     ProductID = Column(Integer, primary_key=True, autoincrement=True)
-    ProductName = Column(String(40))
+    ProductName = Column(String(40), index=True)
     SupplierID = Column(Integer,ForeignKey('suppliers.SupplierID'))
     CategoryID = Column(Integer,ForeignKey('categories.CategoryID'))
     QuantityPerUnit = Column(String(20))
@@ -22,6 +22,13 @@ class Product(Base):
     category = relationship("Category", back_populates="product")
     supplier = relationship("Supplier", back_populates="product")
 
+    # Chỉ mục phủ cho các truy vấn tồn kho theo danh mục / nhà cung cấp và danh sách cần đặt hàng
+    __table_args__ = (
+        Index('ix_products_category_stock', 'CategoryID', 'UnitsInStock', 'UnitsOnOrder', 'UnitPrice'),
+        Index('ix_products_supplier_stock', 'SupplierID', 'UnitsInStock', 'UnitsOnOrder', 'UnitPrice'),
+        Index('ix_products_reorder', 'Discontinued', 'ProductID', 'UnitsInStock', 'ReorderLevel'),
+    )
+
 class OrderDetails(Base):
     __tablename__ = "orderdetails"
 
@@ -40,9 +47,9 @@ class Orders(Base):
     __tablename__= "orders"
 
     OrderID = Column(Integer, primary_key=True, autoincrement=True)
-    CustomerID = Column(String(5),ForeignKey('customers.CustomerID'))
-    EmployeeID = Column(Integer)
-    OrderDate = Column(Date)
+    CustomerID = Column(String(5),ForeignKey('customers.CustomerID'), index=True)
+    EmployeeID = Column(Integer, index=True)
+    OrderDate = Column(Date, index=True)
 
     orderdetails = relationship('OrderDetails', back_populates='orders')
     customer = relationship("Customer", back_populates="orders")
@@ -69,7 +76,7 @@ class Category(Base):
     __tablename__ = 'categories'
 
     CategoryID = Column(Integer, primary_key=True, autoincrement = True)
-    CategoryName = Column(String(15))
+    CategoryName = Column(String(15), index=True)
     Description = Column(Text)
     # Picture = Column(LargeBinary)
 
@@ -101,3 +108,33 @@ class Shipper(Base):
     Phone = Column(String(24))
 
 
+# Bảng tổng hợp doanh thu, cập nhật cùng transaction với create_order (xem rollup.py)
+class RevenueDaily(Base):
+    __tablename__ = "revenue_daily"
+
+    OrderDate = Column(Date, primary_key=True)
+    DailyRevenue = Column(Float(precision=53), nullable=False, default=0)
+
+class RevenueMonthly(Base):
+    __tablename__ = "revenue_monthly"
+
+    Year = Column(Integer, primary_key=True)
+    Month = Column(Integer, primary_key=True)
+    MonthlyRevenue = Column(Float(precision=53), nullable=False, default=0)
+
+class RevenueYearly(Base):
+    __tablename__ = "revenue_yearly"
+
+    Year = Column(Integer, primary_key=True)
+    YearlyRevenue = Column(Float(precision=53), nullable=False, default=0)
+
+
+# Phiên bản dữ liệu từng bảng cho ETag / Last-Modified và khóa cache kết quả, tăng cùng transaction với lệnh ghi
+# (crud.bump_table_versions).
+# Ngoài tên bảng còn có khóa "product_names" (tên sản phẩm, cho chỉ mục tìm kiếm): hóa đơn đổi tồn kho nhưng không đổi
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    TableName = Column(String(64), primary_key=True)
+    Version = Column(Integer, nullable=False, default=0)
+    UpdatedAt = Column(DateTime, nullable=False)
@@ -0,0 +1,114 @@
+# Đo connection pool bằng pool events của SQLAlchemy: số kết nối đang mượn, overflow,
+# thời gian chờ lấy kết nối và số lần checkout/timeout. Xem GET /metrics/pool.
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self):
+        pool = self.engine.pool if self.engine is not None else None
+        data = {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(1000 * self.wait_seconds_total / self.wait_count, 3) if self.wait_count else 0.0,
+            "wait_ms_max": round(1000 * self.wait_seconds_max, 3),
+        }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            })
+        return data
+
+
+class _TimedPoolMixin:
+    # Đo thời gian từ lúc xin kết nối đến khi nhận được (gồm cả chờ hàng đợi và mở kết nối overflow)
+    def _do_get(self):
+        metrics = getattr(self, "_metrics", None)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if metrics is not None:
+                metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if metrics is not None:
+            metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._metrics = getattr(self, "_metrics", None)
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+registry = {}
+
+
+def instrument(engine, name: str) -> PoolMetrics:
+    # engine có thể là Engine hoặc AsyncEngine
+    engine = getattr(engine, "sync_engine", engine)
+    metrics = PoolMetrics(name)
+    metrics.engine = engine
+    engine.pool._metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    registry[name] = metrics
+    return metrics
+
+
+def snapshot_all():
+    return {name: metrics.snapshot() for name, metrics in registry.items()}
@@ -0,0 +1,137 @@
+# Gợi ý "khách mua sản phẩm này cũng mua" và "khách hàng tương tự" từ ma trận đồng mua trong bộ nhớ
+#
+# - products (sản phẩm × sản phẩm): số hóa đơn có cả hai sản phẩm; đường chéo = số hóa đơn có sản phẩm đó
+# - customers (khách hàng × sản phẩm): số hóa đơn của khách hàng có sản phẩm đó
+#
+# Dựng một lần từ OrderDetails (nhóm theo OrderID), sau đó chỉ đọc các hóa đơn mới (OrderID lớn hơn mốc
+# đã đọc) và cộng vào ma trận, không tính lại toàn bộ lịch sử. Cần numpy và scipy; main.py chỉ import
+# module này khi có request gợi ý đầu tiên.
+import numpy as np
+from scipy import sparse
+
+from main.incremental import IncrementalHolder, IncrementalOrders
+
+LOAD_BATCH_SIZE = 50000
+
+
+def _grown(matrix, shape):
+    # Bản sao mở rộng kích thước (không sửa ma trận các request khác đang đọc)
+    grown = matrix.copy()
+    grown.resize(shape)
+    return grown
+
+
+def _top(scores, ids, limit: int):
+    # Điểm giảm dần, cùng điểm thì theo id tăng dần
+    return np.lexsort((ids, -scores))[:limit]
+
+
+class CoPurchaseIndex(IncrementalOrders):
+    load_batch_size = LOAD_BATCH_SIZE
+
+    def __init__(self):
+        super().__init__()
+        self.product_ids = []
+        self.customer_ids = []
+        self._product_pos = {}
+        self._customer_pos = {}
+        self.products = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.customers = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self._customer_unit = None
+        self.orders = 0
+
+    def _position(self, ids, positions, key):
+        position = positions.get(key)
+        if position is None:
+            position = positions[key] = len(ids)
+            ids.append(key)
+        return position
+
+    def apply(self, rows):
+        baskets = {}
+        for order_id, customer_id, product_id in rows:
+            if self.is_loaded(order_id):
+                continue
+            basket = baskets.get(order_id)
+            if basket is None:
+                basket = baskets[order_id] = (customer_id, [])
+            basket[1].append(product_id)
+        if not baskets:
+            return 0
+
+        line_orders, line_products, owners, owned_orders = [], [], [], []
+        for row, (customer_id, product_ids) in enumerate(baskets.values()):
+            if customer_id is not None:
+                owners.append(self._position(self.customer_ids, self._customer_pos, customer_id))
+                owned_orders.append(row)
+            for product_id in product_ids:
+                line_orders.append(row)
+                line_products.append(self._position(self.product_ids, self._product_pos, product_id))
+
+        n_products, n_customers = len(self.product_ids), len(self.customer_ids)
+        # basket: hóa đơn mới × sản phẩm (0/1), owner: khách hàng × hóa đơn mới
+        basket = sparse.csr_matrix((np.ones(len(line_orders), dtype=np.int32), (line_orders, line_products)),
+                                   shape=(len(baskets), n_products))
+        owner = sparse.csr_matrix((np.ones(len(owners), dtype=np.int32), (owners, owned_orders)),
+                                  shape=(n_customers, len(baskets)))
+        products = _grown(self.products, (n_products, n_products)) + (basket.T @ basket)
+        customers = _grown(self.customers, (n_customers, n_products)) + (owner @ basket)
+        self.products, self.customers = products.tocsr(), customers.tocsr()
+        self._customer_unit = None
+
+        self.orders += len(baskets)
+        self.mark_loaded(baskets)
+        return len(baskets)
+
+    def also_bought(self, product_id: int, limit: int = 10):
+        products = self.products
+        position = self._product_pos.get(product_id)
+        if position is None or position >= products.shape[0]:
+            return []
+        row = products.getrow(position)
+        keep = row.indices != position
+        columns, counts = row.indices[keep], row.data[keep]
+        if not len(columns):
+            return []
+        orders = int(products[position, position])
+        ids = np.array([self.product_ids[column] for column in columns])
+        return [{"ProductID": int(ids[index]), "Orders": int(counts[index]),
+                 "Confidence": round(float(counts[index]) / orders, 4)}
+                for index in _top(counts, ids, limit)]
+
+    def _unit_customers(self):
+        # Mỗi dòng chia cho độ dài của nó: tích vô hướng giữa hai dòng là độ tương đồng cosine
+        unit = self._customer_unit
+        if unit is None or unit.shape != self.customers.shape:
+            customers = self.customers.astype(np.float32)
+            norms = np.sqrt(np.asarray(customers.multiply(customers).sum(axis=1)).ravel())
+            scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+            unit = self._customer_unit = (sparse.diags(scale) @ customers).tocsr()
+        return unit
+
+    def similar_customers(self, customer_id: str, limit: int = 10):
+        unit = self._unit_customers()
+        position = self._customer_pos.get(customer_id)
+        if position is None or position >= unit.shape[0]:
+            return []
+        scores = (unit @ unit.getrow(position).T).tocoo()
+        keep = scores.row != position
+        rows, values = scores.row[keep], scores.data[keep]
+        if not len(rows):
+            return []
+        ids = np.array([self.customer_ids[row] for row in rows])
+        return [{"CustomerID": str(ids[index]), "Similarity": round(float(values[index]), 4)}
+                for index in _top(values, ids, limit)]
+
+    def stats(self):
+        return {
+            "orders": self.orders,
+            "products": len(self.product_ids),
+            "customers": len(self.customer_ids),
+            "product_pairs": int(self.products.nnz),
+            "customer_products": int(self.customers.nnz),
+            "last_order_id": self.last_order_id,
+        }
+
+
+holder = IncrementalHolder(CoPurchaseIndex, "co-purchase")
@@ -0,0 +1,195 @@
+# Đo theo request: độ trễ theo route, số truy vấn SQL và thời gian SQL (cursor events của SQLAlchemy)
+#
+# - Header Server-Timing: db (thời gian SQL, số truy vấn) và app (thời gian tới khi gửi header)
+# - Cảnh báo khi một request chạy quá SQL_QUERY_WARN_THRESHOLD truy vấn (dấu hiệu N+1)
+# - GET /metrics xuất toàn bộ dạng Prometheus text, kèm số liệu connection pool (pool_metrics.py)
+#   và số request được gộp (single_flight.py)
+#
+# Số liệu của request hiện tại nằm trong một ContextVar: thread pool của FastAPI và các task con
+# chép context nên truy vấn trong endpoint sync lẫn async đều được tính. Job nhập CSV chạy nền được
+# đếm riêng (track() trong jobs.py, trả về ở GET /imports/{job_id}).
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from main import pool_metrics, single_flight
+
+QUERY_WARN_THRESHOLD = int(os.environ.get("SQL_QUERY_WARN_THRESHOLD", "50"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger("main.sql")
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def track():
+    # Đếm truy vấn SQL chạy trong khối with (request, hoặc job nhập CSV trong thread riêng)
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def instrument_sql(engine):
+    # engine có thể là Engine hoặc AsyncEngine
+    engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and _current.get() is not None:
+            context._request_sql_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is None:
+            return
+        stats.queries += 1
+        started = getattr(context, "_request_sql_started", None)
+        if started is not None:
+            stats.sql_seconds += time.perf_counter() - started
+
+
+class RouteMetrics:
+    __slots__ = ("count", "seconds", "buckets", "queries", "sql_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes = {}  # (method, route, status) -> RouteMetrics
+        self.query_warnings = 0
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            metrics = self.routes.get((method, route, status))
+            if metrics is None:
+                metrics = self.routes[(method, route, status)] = RouteMetrics()
+            metrics.count += 1
+            metrics.seconds += seconds
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    metrics.buckets[index] += 1
+            metrics.queries += stats.queries
+            metrics.sql_seconds += stats.sql_seconds
+            if stats.queries > QUERY_WARN_THRESHOLD:
+                self.query_warnings += 1
+
+    def render(self) -> str:
+        # Định dạng text của Prometheus (exposition format 0.0.4)
+        with self._lock:
+            routes = sorted(self.routes.items())
+            lines = [
+                "# HELP http_requests_total Requests by method, route template and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            lines += [f"http_requests_total{_labels(key)} {metrics.count}" for key, metrics in routes]
+            lines += [
+                "# HELP http_request_duration_seconds Time from request to end of response body.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for key, metrics in routes:
+                for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+                    lines.append(f"http_request_duration_seconds_bucket{_labels(key, le=bound)} {count}")
+                lines.append(f"http_request_duration_seconds_bucket{_labels(key, le='+Inf')} {metrics.count}")
+                lines.append(f"http_request_duration_seconds_sum{_labels(key)} {metrics.seconds:.6f}")
+                lines.append(f"http_request_duration_seconds_count{_labels(key)} {metrics.count}")
+            lines += [
+                "# HELP http_request_sql_queries_total SQL statements executed while serving requests.",
+                "# TYPE http_request_sql_queries_total counter",
+            ]
+            lines += [f"http_request_sql_queries_total{_labels(key)} {metrics.queries}" for key, metrics in routes]
+            lines += [
+                "# HELP http_request_sql_seconds_total Time spent in SQL statements while serving requests.",
+                "# TYPE http_request_sql_seconds_total counter",
+            ]
+            lines += [f"http_request_sql_seconds_total{_labels(key)} {metrics.sql_seconds:.6f}"
+                      for key, metrics in routes]
+            lines += [
+                f"# HELP http_request_sql_query_warnings_total Requests with more than {QUERY_WARN_THRESHOLD} SQL statements.",
+                "# TYPE http_request_sql_query_warnings_total counter",
+                f"http_request_sql_query_warnings_total {self.query_warnings}",
+            ]
+
+        for name, snapshot in sorted(pool_metrics.snapshot_all().items()):
+            for field, value in snapshot.items():
+                lines.append(f'db_pool_{field}{{pool="{_escape(name)}"}} {value}')
+        for name, snapshot in sorted(single_flight.snapshot_all().items()):
+            for field, value in snapshot.items():
+                lines.append(f'single_flight_{field}{{name="{_escape(name)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key, **extra) -> str:
+    method, route, status = key
+    pairs = [("method", method), ("route", route), ("status", status)] + list(extra.items())
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    # Middleware ASGI thuần (không dùng BaseHTTPMiddleware) để chi phí mỗi request nhỏ
+    def __init__(self, app, metrics: MetricsRegistry = registry):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                                                f'app;dur={(time.perf_counter() - started) * 1000:.1f}')
+            await send(message)
+
+        try:
+            with track() as stats:
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            seconds = time.perf_counter() - started
+            # Nhãn là template của route (vd. /imports/{job_id}) để số chuỗi thời gian không tăng theo URL
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            self.metrics.observe(scope["method"], route_path, status, seconds, stats)
+            if stats.queries > QUERY_WARN_THRESHOLD:
+                logger.warning("%s %s ran %d SQL statements (%.1f ms) - possible N+1 query pattern",
+                               scope["method"], route_path, stats.queries, stats.sql_seconds * 1000)
@@ -0,0 +1,158 @@
+# Bảng tổng hợp doanh thu theo ngày / tháng / năm (model.RevenueDaily, RevenueMonthly, RevenueYearly)
+#
+# Đổ dữ liệu lần đầu:            python -m main.rollup backfill
+# Đối chiếu với truy vấn gốc:    python -m main.rollup verify
+import sys
+from collections import defaultdict
+
+from sqlalchemy import delete, extract, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from main import model
+
+
+def line_revenue(line=model.OrderDetails):
+    # Giá trị một dòng hóa đơn: biểu thức SQL (mặc định) hoặc số, với một dòng vừa nhận trong request
+    return line.UnitPrice * line.Quantity * (1 - line.Discount)
+
+
+# Truy vấn gốc: join + GROUP BY trên toàn bộ Orders/OrderDetails
+def raw_daily_revenue_query():
+    return select(model.Orders.OrderDate, func.sum(line_revenue()).label('DailyRevenue')).\
+            join(model.OrderDetails, model.Orders.OrderID == model.OrderDetails.OrderID).\
+            group_by(model.Orders.OrderDate).\
+            order_by(model.Orders.OrderDate)
+
+def raw_monthly_revenue_query():
+    year = extract('year', model.Orders.OrderDate)
+    month = extract('month', model.Orders.OrderDate)
+    return select(year.label('Year'), month.label('Month'), func.sum(line_revenue()).label('MonthlyRevenue')).\
+            join(model.OrderDetails, model.Orders.OrderID == model.OrderDetails.OrderID).\
+            group_by(year, month).\
+            order_by(year, month)
+
+def raw_yearly_revenue_query():
+    year = extract('year', model.Orders.OrderDate)
+    return select(year.label('Year'), func.sum(line_revenue()).label('YearlyRevenue')).\
+            join(model.OrderDetails, model.Orders.OrderID == model.OrderDetails.OrderID).\
+            group_by(year).\
+            order_by(year)
+
+
+# Đọc từ bảng tổng hợp (câu lệnh dùng được cho cả Session và AsyncSession)
+def daily_summary_query():
+    return select(model.RevenueDaily.OrderDate, model.RevenueDaily.DailyRevenue).\
+            order_by(model.RevenueDaily.OrderDate)
+
+def monthly_summary_query():
+    return select(model.RevenueMonthly.Month, model.RevenueMonthly.Year, model.RevenueMonthly.MonthlyRevenue).\
+            order_by(model.RevenueMonthly.Year, model.RevenueMonthly.Month)
+
+def yearly_summary_query():
+    return select(model.RevenueYearly.Year, model.RevenueYearly.YearlyRevenue).\
+            order_by(model.RevenueYearly.Year)
+
+def get_daily_revenue(db: Session):
+    return [dict(row._mapping) for row in db.execute(daily_summary_query())]
+
+def get_monthly_revenue(db: Session):
+    return [dict(row._mapping) for row in db.execute(monthly_summary_query())]
+
+def get_yearly_revenue(db: Session):
+    return [dict(row._mapping) for row in db.execute(yearly_summary_query())]
+
+
+def upsert_add(db: Session, entity, keys: dict, column: str, amount: float, **assign):
+    # Cộng dồn amount vào dòng có khóa keys, tạo dòng mới nếu chưa có; assign: các cột gán thẳng giá trị mới
+    table = entity.__table__
+    values = dict(keys, **{column: amount}, **assign)
+    dialect = db.get_bind().dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table).values(**values)
+        db.execute(stmt.on_duplicate_key_update({column: table.c[column] + stmt.inserted[column], **assign}))
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(table).values(**values)
+        db.execute(stmt.on_conflict_do_update(index_elements=list(keys),
+                                              set_={column: table.c[column] + stmt.excluded[column], **assign}))
+    else:
+        condition = [table.c[key] == value for key, value in keys.items()]
+        result = db.execute(update(table).where(*condition).values({column: table.c[column] + amount, **assign}))
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**values))
+
+def add_revenue(db: Session, amounts: dict):
+    # amounts: {ngày: doanh thu}. Không commit: gọi trong cùng transaction với việc ghi OrderDetails.
+    # Cộng theo ngày / tháng / năm trước, rồi upsert từng bảng theo thứ tự khóa (ngày, rồi tháng, rồi năm):
+    # các transaction đồng thời khóa các dòng tổng hợp theo cùng một thứ tự, tránh deadlock
+    daily, monthly, yearly = defaultdict(float), defaultdict(float), defaultdict(float)
+    for order_date, amount in amounts.items():
+        if order_date is None:
+            continue
+        daily[order_date] += amount
+        monthly[(order_date.year, order_date.month)] += amount
+        yearly[order_date.year] += amount
+    for order_date in sorted(daily):
+        upsert_add(db, model.RevenueDaily, {"OrderDate": order_date}, "DailyRevenue", daily[order_date])
+    for year, month in sorted(monthly):
+        upsert_add(db, model.RevenueMonthly, {"Year": year, "Month": month}, "MonthlyRevenue", monthly[(year, month)])
+    for year in sorted(yearly):
+        upsert_add(db, model.RevenueYearly, {"Year": year}, "YearlyRevenue", yearly[year])
+
+def add_order_revenue(db: Session, order_date, amount: float):
+    add_revenue(db, {order_date: amount})
+
+def backfill(db: Session):
+    # Tính lại toàn bộ bằng INSERT ... SELECT, không kéo dữ liệu về Python
+    targets = [
+        (model.RevenueDaily, ['OrderDate', 'DailyRevenue'], raw_daily_revenue_query()),
+        (model.RevenueMonthly, ['Year', 'Month', 'MonthlyRevenue'], raw_monthly_revenue_query()),
+        (model.RevenueYearly, ['Year', 'YearlyRevenue'], raw_yearly_revenue_query()),
+    ]
+    try:
+        for entity, columns, query in targets:
+            db.execute(delete(entity))
+            db.execute(insert(entity).from_select(columns, query.order_by(None)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def verify(db: Session, tolerance: float = 1e-6):
+    # Trả về danh sách các dòng lệch giữa bảng tổng hợp và truy vấn gốc
+    checks = [
+        ('daily', raw_daily_revenue_query(), get_daily_revenue(db), ['OrderDate'], 'DailyRevenue'),
+        ('monthly', raw_monthly_revenue_query(), get_monthly_revenue(db), ['Year', 'Month'], 'MonthlyRevenue'),
+        ('yearly', raw_yearly_revenue_query(), get_yearly_revenue(db), ['Year'], 'YearlyRevenue'),
+    ]
+    mismatches = []
+    for period, query, summary_rows, keys, column in checks:
+        raw = {tuple(row._mapping[key] for key in keys): float(row._mapping[column]) for row in db.execute(query)}
+        summary = {tuple(row[key] for key in keys): float(row[column]) for row in summary_rows}
+        for key in sorted(set(raw) | set(summary), key=str):
+            expected, actual = raw.get(key), summary.get(key)
+            if expected is None or actual is None or abs(expected - actual) > tolerance * max(1.0, abs(expected)):
+                mismatches.append({"period": period, "key": key, "raw": expected, "summary": actual})
+    return mismatches
+
+
+if __name__ == "__main__":
+    from main.database import SessionLocal
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "backfill"
+    db = SessionLocal()
+    try:
+        if command == "backfill":
+            backfill(db)
+            print("Revenue summary tables rebuilt")
+        elif command == "verify":
+            mismatches = verify(db)
+            for item in mismatches:
+                print(item)
+            print(f"{len(mismatches)} mismatches")
+            sys.exit(1 if mismatches else 0)
+        else:
+            sys.exit(f"Unknown command: {command}. Allowed values: backfill, verify")
+    finally:
+        db.close()
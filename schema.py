@@ -42,6 +42,12 @@ class OrderCreate(BaseModel):
     OrderDate: datetime
     Products: List[OrderProductCreate]
 
+class OrderBulkCreate(BaseModel):
+    Orders: List[OrderCreate]
+
+class InvoiceBatchRequest(BaseModel):
+    OrderIDs: List[int]
+
 class Customer(BaseModel):
     CustomerID : str
     CompanyName : str
@@ -0,0 +1,165 @@
+# Chỉ mục tìm kiếm tên sản phẩm trong bộ nhớ, thay cho ProductName ILIKE '%term%' (quét toàn bảng)
+#
+# - Tiền tố (autocomplete): hai danh sách đã sắp xếp, một cho tên đầy đủ và một cho từng từ
+#   bắt đầu giữa tên; tra bằng bisect nên chi phí O(log n + limit).
+# - Chuỗi con (search): posting list theo trigram, giao các danh sách rồi kiểm tra lại và xếp hạng.
+#
+# Chỉ mục gắn với phiên bản "product_names" trong table_versions (tăng khi nhập sản phẩm): request thấy
+# phiên bản mới hơn thì dựng lại trước khi trả kết quả, ở mọi worker. Ngoài ra dựng lại nền sau max_age giây.
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+MAX_PREFIX_SCAN = 10000
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def _word_starts(name: str):
+    return [index for index in range(1, len(name)) if name[index - 1] == " " and name[index] != " "]
+
+
+def _trigrams(name: str):
+    return {name[index:index + 3] for index in range(len(name) - 2)}
+
+
+def _contains(sorted_ids, value) -> bool:
+    index = bisect_left(sorted_ids, value)
+    return index < len(sorted_ids) and sorted_ids[index] == value
+
+
+class ProductSearchIndex:
+    def __init__(self, rows):
+        # rows: các cặp (ProductID, ProductName)
+        self.names = {}
+        self._normalized = {}
+        name_keys, word_keys = [], []
+        grams = defaultdict(list)
+        for product_id, product_name in rows:
+            if not product_name:
+                continue
+            self.names[product_id] = product_name
+            name = self._normalized[product_id] = normalize(product_name)
+            name_keys.append((name, product_id))
+            for start in _word_starts(name):
+                word_keys.append((name[start:], product_id))
+            for gram in _trigrams(name):
+                grams[gram].append(product_id)
+
+        name_keys.sort()
+        word_keys.sort()
+        self._name_keys = [key for key, _ in name_keys]
+        self._name_ids = array('q', [product_id for _, product_id in name_keys])
+        self._word_keys = [key for key, _ in word_keys]
+        self._word_ids = array('q', [product_id for _, product_id in word_keys])
+        self._grams = {gram: array('q', sorted(ids)) for gram, ids in grams.items()}
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix_range(self, keys, prefix: str):
+        return bisect_left(keys, prefix), bisect_left(keys, prefix + "\U0010ffff")
+
+    def autocomplete(self, prefix: str, limit: int = 10):
+        # Tên bắt đầu bằng prefix trước, sau đó tới tên có một từ bắt đầu bằng prefix (theo thứ tự chữ cái)
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        for keys, ids in ((self._name_keys, self._name_ids), (self._word_keys, self._word_ids)):
+            lo, hi = self._prefix_range(keys, prefix)
+            for index in range(lo, hi):
+                product_id = ids[index]
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                results.append({"ProductID": product_id, "ProductName": self.names[product_id]})
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def _rank(self, product_id: int, term: str):
+        name = self._normalized[product_id]
+        if name == term:
+            score = 0
+        elif name.startswith(term):
+            score = 1
+        elif (" " + term) in name:
+            score = 2
+        else:
+            score = 3
+        return score, len(name), name, product_id
+
+    def search(self, term: str, limit: int = 20):
+        # Trả về danh sách ProductID đã xếp hạng: trùng khớp, tiền tố tên, tiền tố một từ, chuỗi con
+        term = normalize(term)
+        if not term:
+            return []
+        if len(term) < 3:
+            candidates = set()
+            for keys, ids in ((self._name_keys, self._name_ids), (self._word_keys, self._word_ids)):
+                lo, hi = self._prefix_range(keys, term)
+                candidates.update(ids[lo:min(hi, lo + MAX_PREFIX_SCAN)])
+            if len(candidates) < limit:
+                # Không đủ kết quả tiền tố: quét chuỗi con trên mọi tên như ILIKE '%term%' (vd. "ai" khớp "Chai")
+                candidates.update(product_id for product_id, name in self._normalized.items() if term in name)
+        else:
+            postings = []
+            for gram in _trigrams(term):
+                ids = self._grams.get(gram)
+                if ids is None:
+                    return []
+                postings.append(ids)
+            postings.sort(key=len)
+            candidates = [product_id for product_id in postings[0]
+                          if all(_contains(ids, product_id) for ids in postings[1:])
+                          and term in self._normalized[product_id]]
+        ranked = heapq.nsmallest(limit, (self._rank(product_id, term) for product_id in candidates))
+        return [item[-1] for item in ranked]
+
+
+class ProductIndexHolder:
+    def __init__(self, max_age: float = 300.0):
+        self.max_age = max_age
+        self.index = None
+        self.version = None
+        self._build_lock = threading.Lock()
+        self._refreshing = threading.Event()
+
+    def is_stale(self) -> bool:
+        return self.index is None or time.monotonic() - self.index.built_at > self.max_age
+
+    def build(self, load_rows, version=None):
+        # Dựng khi chưa có chỉ mục hoặc chỉ mục cũ hơn version (phiên bản đọc từ table_versions trước khi gọi);
+        # các request đến cùng lúc chờ kết quả của một lần dựng thay vì mỗi request tự đọc bảng products
+        with self._build_lock:
+            if self.index is None or (version is not None and version != self.version):
+                self.replace(load_rows(), version)
+            return self.index
+
+    def replace(self, rows, version=None):
+        # Gán chỉ mục trước phiên bản: request đọc song song không thấy phiên bản mới đi cùng chỉ mục cũ
+        self.index = ProductSearchIndex(rows)
+        self.version = version
+        return self.index
+
+    def refresh_in_background(self, load_rows):
+        # Vẫn phục vụ bằng chỉ mục cũ trong lúc dựng lại; chỉ một luồng dựng tại một thời điểm
+        if self._refreshing.is_set():
+            return
+        self._refreshing.set()
+        version = self.version
+
+        def refresh():
+            try:
+                self.replace(load_rows(), version)
+            finally:
+                self._refreshing.clear()
+
+        threading.Thread(target=refresh, name="product-index-refresh", daemon=True).start()
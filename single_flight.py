@@ -0,0 +1,62 @@
+# Gộp các request đọc giống nhau chạy đồng thời: request đầu tiên (leader) chạy truy vấn, các request
+# cùng khóa đến trong lúc đó (coalesced) chờ và nhận chung kết quả, không chạy thêm truy vấn nào.
+#
+# Dùng bên dưới ResultCache: cache trống hoặc vừa bị invalidate thì cả loạt request của một lần refresh
+# dashboard chỉ tốn một truy vấn. Chỉ gộp trong một tiến trình (mỗi worker uvicorn một nhóm riêng).
+# Số liệu: GET /metrics (single_flight_*).
+import asyncio
+
+registry = {}
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}   # khóa -> task đang chạy
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+        registry[name] = self
+
+    async def do(self, key, compute):
+        # compute: coroutine function không nhận tham số; phải tự mở session riêng vì có thể chạy lâu hơn
+        # request của leader (leader bị hủy thì các request đang chờ vẫn nhận được kết quả)
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = self._calls[key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def snapshot(self):
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._calls),
+        }
+
+
+async def cached(cache, flight, key, compute, tags=()):
+    # cache.ResultCache bên trên, flight bên dưới. Khóa của flight kèm thế hệ các tag của cache: request đến sau
+    # invalidate (lệnh ghi đã commit) không nhập vào truy vấn bắt đầu trước lệnh ghi mà chạy truy vấn mới;
+    # truy vấn cũ vẫn trả kết quả cho các request đã chờ nó nhưng không được lưu vào cache
+    return await cache.aget_or_compute(key, lambda: flight.do(key + cache.generation(*tags), compute), tags=tags)
+
+
+def snapshot_all():
+    return {name: flight.snapshot() for name, flight in registry.items()}
+
+
+class NullFlight:
+    # Cùng giao diện nhưng không gộp (vd. client vừa ghi: không dùng chung truy vấn bắt đầu trước lệnh ghi)
+    async def do(self, key, compute):
+        return await compute()
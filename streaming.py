@@ -0,0 +1,62 @@
+# Trả kết quả truy vấn lớn dạng NDJSON/CSV từ server-side cursor, mỗi lần chỉ giữ một lô trong bộ nhớ
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+
+from fastapi.responses import StreamingResponse
+
+STREAM_BATCH_SIZE = 1000
+
+
+class StreamFormat(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    StreamFormat.ndjson: "application/x-ndjson",
+    StreamFormat.csv: "text/csv",
+}
+
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def stream_query(session_factory, query, params=None, fmt: StreamFormat = StreamFormat.ndjson,
+                       transform=dict, batch_size: int = STREAM_BATCH_SIZE):
+    # Session riêng cho generator: nó còn chạy sau khi handler đã trả về
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size), params or {})
+        columns = list(result.keys())
+        if fmt == StreamFormat.csv:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        async for rows in result.mappings().partitions(batch_size):
+            records = [transform(row) for row in rows]
+            if fmt == StreamFormat.csv:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows([record[column] for column in columns] for record in records)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(record, default=json_default) + "\n" for record in records)
+
+
+def streaming_response(session_factory, query, params=None, fmt: StreamFormat = StreamFormat.ndjson,
+                       transform=dict, filename: str = "export"):
+    headers = {}
+    if fmt == StreamFormat.csv:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return StreamingResponse(stream_query(session_factory, query, params, fmt, transform),
+                             media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,43 @@
+# Test chạy trên một CSDL SQLite tạm, dữ liệu sinh bởi benchmarks.northwind_data (không cần MySQL).
+# DATABASE_URL phải được đặt trước khi import main.database: luôn ghi đè, test không bao giờ chạm CSDL thật.
+import os
+import tempfile
+
+import pytest
+
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(prefix="northwind-test-"), "northwind.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_PATH}"
+for name in ("ASYNC_DATABASE_URL", "REPLICA_DATABASE_URLS"):
+    os.environ.pop(name, None)
+
+TEST_DETAILS = 3000
+
+
+@pytest.fixture(scope="session")
+def database():
+    from main import database
+    from main.benchmarks import northwind_data
+
+    northwind_data.generate(database.engine, TEST_DETAILS, seed=0)
+    return database
+
+
+@pytest.fixture
+def db(database):
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def client(database):
+    from fastapi.testclient import TestClient
+
+    from main import main as app_module
+
+    app_module.result_cache.clear()
+    with TestClient(app_module.create_app()) as client:
+        yield client
@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+
+from main import analytics
+
+
+def line(order_id, order_date, product_id=1, country="Germany", price=10.0, quantity=1, discount=0.0):
+    # Cùng thứ tự cột với crud.sales_facts_query
+    return (order_id, order_date, product_id, 1, 1, "ALFKI", country, 1, price, quantity, discount)
+
+
+@pytest.fixture
+def cube():
+    cube = analytics.SalesCube()
+    cube.load([
+        line(1, date(1997, 12, 31), price=10.0, quantity=2),
+        line(2, date(1998, 1, 5), price=5.0, quantity=1),
+        line(2, date(1998, 1, 5), product_id=2, price=20.0, quantity=1, discount=0.5),
+    ])
+    return cube
+
+
+def test_month_filter(cube):
+    assert cube.revenue([], {"month": ["1998-01"]}) == [{"Revenue": 15.0, "Quantity": 2, "Lines": 2}]
+    assert cube.revenue(["month"], {"month": ["1997-12"]}) == [
+        {"Year": 1997, "Month": 12, "Revenue": 20.0, "Quantity": 2, "Lines": 1}]
+
+
+@pytest.mark.parametrize("value", ["1997-13", "1997-0", "1997", "1997-01-01", "x-01"])
+def test_invalid_month_rejected(cube, value):
+    with pytest.raises(analytics.InvalidQuery):
+        cube.revenue([], {"month": [value]})
+
+
+def test_reloaded_orders_not_counted_twice(cube):
+    # Làm mới nền đọc lại khoảng chồng lấn trước mốc OrderID
+    cube.load([line(2, date(1998, 1, 5), price=5.0), line(3, date(1998, 2, 1), price=1.0)])
+    assert cube.revenue([], {}) == [{"Revenue": 36.0, "Quantity": 5, "Lines": 4}]
+    assert cube.last_order_id == 3
+
+
+def committed_loader(table):
+    # Giả lập crud.sales_facts_query trên các dòng đã commit: sau mốc hoặc trong các khoảng OrderID chờ
+    def load_rows(after_order_id, pending_ranges):
+        return sorted(row for row in table if after_order_id is None or row[0] > after_order_id
+                      or any(low <= row[0] <= high for low, high in pending_ranges))
+    return load_rows
+
+
+def refresh(cube, load_rows):
+    cube.load(load_rows(cube.reload_after(), cube.pending_ranges()))
+
+
+def test_bulk_committed_after_higher_order_is_loaded():
+    # /orders/bulk nhận OrderID 11..5010 lúc flush nhưng commit sau hóa đơn 5011
+    table = [line(order_id, date(1998, 1, 1)) for order_id in range(1, 11)]
+    cube = analytics.SalesCube()
+    refresh(cube, committed_loader(table))
+    table.append(line(5011, date(1998, 1, 2)))
+    refresh(cube, committed_loader(table))
+    assert cube.revenue([], {})[0]["Lines"] == 11
+
+    table += [line(order_id, date(1998, 1, 3)) for order_id in range(11, 5011)]
+    refresh(cube, committed_loader(table))
+    assert cube.revenue([], {})[0]["Lines"] == 5011
+    assert cube.pending_ranges() == []
+    # Làm mới tiếp không đếm lại
+    refresh(cube, committed_loader(table))
+    assert cube.revenue([], {})[0]["Lines"] == 5011
+
+
+def test_incremental_orders_requires_apply():
+    from main.incremental import IncrementalOrders
+
+    class Incomplete(IncrementalOrders):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
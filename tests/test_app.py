@@ -0,0 +1,70 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from main import main as app_module
+
+
+def upload_shippers(client, name):
+    data = f"CompanyName,Phone\n{name},(503) 555-0000\n".encode()
+    response = client.post("/Shipper/upload-data", files={"file": ("shippers.csv", data, "text/csv")})
+    assert response.status_code == 202, response.text
+    job_id = response.json()["job_id"]
+    for _ in range(200):
+        job = client.get(f"/imports/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"import job {job_id} did not finish")
+
+
+def test_imports_work_across_app_lifecycles(database):
+    # Mỗi app tạo và đóng thread pool nhập CSV của mình: lifecycle sau vẫn nhận job
+    for index in range(2):
+        with TestClient(app_module.create_app()) as client:
+            assert upload_shippers(client, f"Lifecycle Express {index}")["status"] == "succeeded"
+            assert len(client.get("/imports").json()) == 1
+
+
+def write_elsewhere(db, year, amount):
+    # Như một lệnh ghi ở worker khác: đổi dữ liệu và phiên bản nhưng không invalidate result_cache của tiến trình này
+    from main import crud, model
+
+    db.query(model.RevenueYearly).filter(model.RevenueYearly.Year == year).\
+        update({model.RevenueYearly.YearlyRevenue: model.RevenueYearly.YearlyRevenue + amount})
+    crud.bump_table_versions(db, "orders")
+    db.commit()
+
+
+def test_revenue_cache_is_keyed_on_table_versions(client, db):
+    first = client.get("/revenue/yearly").json()
+    year, revenue = first[0]["Year"], first[0]["YearlyRevenue"]
+    assert client.get("/revenue/yearly").json() == first
+    write_elsewhere(db, year, 1000)
+    try:
+        assert client.get("/revenue/yearly").json()[0]["YearlyRevenue"] == revenue + 1000
+    finally:
+        write_elsewhere(db, year, -1000)
+    assert client.get("/revenue/yearly").json()[0]["YearlyRevenue"] == revenue
+
+
+def move_stock_elsewhere(db, product_id, units):
+    from main import crud, model
+
+    db.query(model.Product).filter(model.Product.ProductID == product_id).\
+        update({model.Product.UnitsInStock: model.Product.UnitsInStock + units})
+    crud.bump_table_versions(db, "products")
+    db.commit()
+
+
+def test_inventory_cache_sees_writes_from_other_workers(client, db):
+    from main import model
+
+    product = db.query(model.Product).filter(model.Product.CategoryID == 1).first()
+    totals = {row["CategoryID"]: row["UnitsInStock"] for row in client.get("/inventory/by-category").json()}
+    move_stock_elsewhere(db, product.ProductID, 7)
+    try:
+        rows = client.get("/inventory/by-category").json()
+        assert {row["CategoryID"]: row["UnitsInStock"] for row in rows}[1] == totals[1] + 7
+    finally:
+        move_stock_elsewhere(db, product.ProductID, -7)
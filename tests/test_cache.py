@@ -0,0 +1,64 @@
+from main import cache as cache_module
+from main.cache import ResultCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def counter():
+    calls = []
+
+    def compute(value):
+        def run():
+            calls.append(value)
+            return value
+        return run
+    return calls, compute
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    cache = ResultCache(ttl=60)
+    calls, compute = counter()
+
+    assert cache.get_or_compute("daily", compute("old")) == "old"
+    clock.now += 59
+    assert cache.get_or_compute("daily", compute("new")) == "old"
+    clock.now += 2
+    assert cache.get_or_compute("daily", compute("new")) == "new"
+    assert calls == ["old", "new"]
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    calls, compute = counter()
+    cache.get_or_compute("a", compute("a"))
+    cache.get_or_compute("b", compute("b"))
+    cache.get_or_compute("a", compute("a"))   # a dùng gần đây hơn b
+    cache.get_or_compute("c", compute("c"))
+
+    cache.get_or_compute("a", compute("a"))
+    cache.get_or_compute("b", compute("b"))
+    assert calls == ["a", "b", "c", "b"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (2, 4, 2, 2)
+
+
+def test_invalidate_drops_only_tagged_entries():
+    cache = ResultCache()
+    calls, compute = counter()
+    cache.get_or_compute("revenue", compute("revenue"), tags=("revenue",))
+    cache.get_or_compute("stock", compute("stock"), tags=("stock",))
+    cache.invalidate("revenue")
+
+    cache.get_or_compute("revenue", compute("revenue"), tags=("revenue",))
+    cache.get_or_compute("stock", compute("stock"), tags=("stock",))
+    assert calls == ["revenue", "stock", "revenue"]
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,41 @@
+from main import crud
+from main.main import etag_matches
+
+
+def test_etag_matches():
+    etag = 'W/"products.3.1700000000"'
+    assert etag_matches(etag, etag)
+    assert etag_matches('"products.3.1700000000"', etag)
+    assert etag_matches('W/"customers.1.0", W/"products.3.1700000000"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"products.2.1700000000"', etag)
+    assert not etag_matches('W/"products.3.1700000000-product_names.1.0"', etag)
+
+
+def test_not_modified_until_the_table_version_changes(client, db):
+    response = client.get("/product/stock")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    cached = client.get("/product/stock", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    crud.bump_table_versions(db, "products")
+    db.commit()
+    changed = client.get("/product/stock", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["Product"]
+    # If-None-Match được ưu tiên hơn If-Modified-Since (chỉ chính xác tới giây)
+    headers = {"If-None-Match": etag, "If-Modified-Since": changed.headers["Last-Modified"]}
+    assert client.get("/product/stock", headers=headers).status_code == 200
+
+
+def test_if_modified_since(client, db):
+    crud.bump_table_versions(db, "customers")
+    db.commit()
+    last_modified = client.get("/customers/").headers["Last-Modified"]
+    assert client.get("/customers/", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/customers/", headers={"If-Modified-Since": "Mon, 01 Jan 1990 00:00:00 GMT"}).status_code == 200
@@ -0,0 +1,107 @@
+# Kế hoạch thực thi (EXPLAIN QUERY PLAN) của các truy vấn endpoint trên CSDL test (SQLite, dữ liệu sinh bởi
+# benchmarks.northwind_data): truy vấn nào quét toàn bảng ("SCAN <bảng>" không dùng chỉ mục) thì test lỗi.
+# Thống kê của bộ tối ưu được cập nhật (ANALYZE) trước: không có thống kê, SQLite coi mọi bảng cùng cỡ.
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from main import crud, model, rollup
+
+# Các truy vấn vốn đọc toàn bộ một bảng nhỏ (table_versions: một dòng mỗi bảng được theo dõi), toàn bộ danh mục
+# hoặc toàn bộ lịch sử (lần dựng đầu của cube / ma trận đồng mua): cho phép quét toàn bảng đó
+ALLOWED_FULL_SCANS = {
+    "revenue_daily_summary": {"revenue_daily"},
+    "revenue_monthly_summary": {"revenue_monthly"},
+    "revenue_yearly_summary": {"revenue_yearly"},
+    "stock_products": {"products"},
+    "total_stock": {"products"},
+    "stock_by_category": {"categories", "products"},
+    "stock_by_supplier": {"suppliers", "products"},
+    "sales_facts_full": {"orderdetails"},
+    "co_purchase_lines_full": {"orderdetails"},
+    "table_versions": {"table_versions"},
+}
+
+
+def endpoint_queries(connection):
+    order_id, employee_id, order_date = connection.execute(
+        select(model.Orders.OrderID, model.Orders.EmployeeID, model.Orders.OrderDate).limit(1)).one()
+    last_order_id = connection.execute(select(func.max(model.Orders.OrderID))).scalar_one()
+    product_id = connection.execute(select(model.OrderDetails.ProductID).limit(1)).scalar_one()
+    customer_id = connection.execute(select(func.min(model.Customer.CustomerID))).scalar_one()
+    pending = (last_order_id - 50, last_order_id - 40)
+    return {
+        "orderdetail": crud.invoice_lines_query([order_id]),
+        "orderdetail_batch": crud.invoice_lines_query([order_id, order_id + 1, order_id + 2]),
+        "revenue_daily_summary": rollup.daily_summary_query(),
+        "revenue_monthly_summary": rollup.monthly_summary_query(),
+        "revenue_yearly_summary": rollup.yearly_summary_query(),
+        "stock_products": crud.stock_products_query(),
+        "total_stock": crud.total_stock_query(),
+        "stock_by_category": crud.stock_by_category_query(None, 50),
+        "stock_by_supplier": crud.stock_by_supplier_query(None, 50),
+        "reorder_products": crud.reorder_products_query(None, 100),
+        "employee_invoices": crud.employee_invoices_query(employee_id),
+        "employee_invoice_count": crud.employee_invoice_count_query(employee_id),
+        "employee_performance": crud.employee_performance_query(order_date, order_date + timedelta(days=30)),
+        "customers_page": crud.customers_page_query(customer_id, 50),
+        "product_customers": crud.product_customers_query(product_id),
+        "product_details": crud.product_details_query([product_id]),
+        "order_facts_range": crud.order_facts_query(order_date, order_date + timedelta(days=30)),
+        "order_facts_employee": crud.order_facts_query(order_date, order_date + timedelta(days=30), employee_id),
+        "sales_facts_full": crud.sales_facts_query(),
+        "sales_facts_refresh": crud.sales_facts_query(last_order_id - 10),
+        "sales_facts_pending": crud.sales_facts_query(order_id_range=pending),
+        "sales_facts_written": crud.sales_facts_query(order_ids=[order_id, order_id + 1]),
+        "co_purchase_lines_full": crud.co_purchase_lines_query(),
+        "co_purchase_lines_refresh": crud.co_purchase_lines_query(last_order_id - 10),
+        "co_purchase_lines_pending": crud.co_purchase_lines_query(order_id_range=pending),
+        "table_versions": crud.table_versions_query(["products", "product_names"]),
+    }
+
+
+QUERY_NAMES = list(ALLOWED_FULL_SCANS) + [
+    "orderdetail", "orderdetail_batch", "reorder_products", "employee_invoices", "employee_invoice_count",
+    "employee_performance", "customers_page", "product_customers", "product_details", "order_facts_range",
+    "order_facts_employee", "sales_facts_refresh", "sales_facts_pending", "sales_facts_written",
+    "co_purchase_lines_refresh", "co_purchase_lines_pending",
+]
+
+
+@pytest.fixture(scope="module")
+def connection(database):
+    with database.engine.connect() as connection:
+        connection.exec_driver_sql("ANALYZE")
+        connection.commit()
+        yield connection
+
+
+@pytest.fixture(scope="module")
+def queries(connection):
+    return endpoint_queries(connection)
+
+
+def full_scans(connection, query):
+    # Tên các bảng bị quét toàn bộ
+    sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    scans = set()
+    for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql):
+        detail = row[-1]
+        # "SCAN t USING [COVERING] INDEX" vẫn đọc cả bảng (theo thứ tự chỉ mục); chỉ SEARCH mới là tra chỉ mục
+        if detail.startswith("SCAN ") and not detail.startswith("SCAN CONSTANT"):
+            scans.add(detail.split()[1])
+    return scans
+
+
+def test_every_query_is_checked(queries):
+    assert sorted(queries) == sorted(QUERY_NAMES)
+
+
+@pytest.mark.parametrize("name", QUERY_NAMES)
+def test_no_unexpected_full_scan(connection, queries, name):
+    assert full_scans(connection, queries[name]) - ALLOWED_FULL_SCANS.get(name, set()) == set()
+
+
+def test_detects_full_scan(connection, queries):
+    assert full_scans(connection, queries["sales_facts_full"]) == {"orderdetails"}
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import func, select
+
+from main import model, rollup
+
+ORDER_DATE = "1997-03-14T00:00:00"
+
+
+def stocked_products(db, count=2):
+    return db.query(model.Product).filter(model.Product.UnitsInStock > 10).\
+        order_by(model.Product.ProductID).limit(count).all()
+
+
+def order_body(db, lines):
+    customer_id = db.scalar(select(func.min(model.Customer.CustomerID)))
+    return {"CustomerID": customer_id, "EmployeeID": 1, "OrderDate": ORDER_DATE,
+            "Products": [{"ProductID": product_id, "Quantity": quantity, "UnitPrice": 10.0, "Discount": 0.1}
+                         for product_id, quantity in lines]}
+
+
+def stock_of(db, products):
+    db.expire_all()
+    return [db.get(model.Product, product.ProductID).UnitsInStock for product in products]
+
+
+def order_count(db):
+    return db.scalar(select(func.count()).select_from(model.Orders))
+
+
+def test_order_reserves_stock_and_updates_rollups(client, db):
+    products = stocked_products(db)
+    before = stock_of(db, products)
+    yearly = {row["Year"]: row["YearlyRevenue"] for row in client.get("/revenue/yearly").json()}
+
+    response = client.post("/orders/", json=order_body(db, [(products[0].ProductID, 3), (products[1].ProductID, 2)]))
+    assert response.status_code == 200, response.text
+
+    assert stock_of(db, products) == [before[0] - 3, before[1] - 2]
+    assert rollup.verify(db) == []
+    after = {row["Year"]: row["YearlyRevenue"] for row in client.get("/revenue/yearly").json()}
+    assert after[1997] == pytest.approx(yearly[1997] + 5 * 10.0 * 0.9)
+
+
+def test_insufficient_stock_returns_409(client, db):
+    product = stocked_products(db, 1)[0]
+    response = client.post("/orders/", json=order_body(db, [(product.ProductID, product.UnitsInStock + 1)]))
+    assert response.status_code == 409
+    assert response.json()["detail"]["ProductID"] == product.ProductID
+
+
+def test_failed_line_rolls_back_the_whole_request(client, db):
+    # Dòng đủ hàng có ProductID nhỏ hơn nên đã bị trừ kho trước khi dòng thiếu hàng thất bại
+    products = stocked_products(db)
+    before, orders = stock_of(db, products), order_count(db)
+    ok = order_body(db, [(products[0].ProductID, 1)])
+    short = order_body(db, [(products[0].ProductID, 1), (products[1].ProductID, products[1].UnitsInStock + 1)])
+
+    assert client.post("/orders/", json=short).status_code == 409
+    assert client.post("/orders/bulk", json={"Orders": [ok, short]}).status_code == 409
+
+    assert stock_of(db, products) == before
+    assert order_count(db) == orders
+    assert rollup.verify(db) == []
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("scipy")
+
+from main import recommendations  # noqa: E402
+
+
+def committed_loader(table):
+    # Giả lập crud.co_purchase_lines_query trên các dòng đã commit: sau mốc hoặc trong các khoảng OrderID chờ
+    def load_rows(after_order_id, pending_ranges):
+        return sorted(row for row in table if after_order_id is None or row[0] > after_order_id
+                      or any(low <= row[0] <= high for low, high in pending_ranges))
+    return load_rows
+
+
+def refresh(index, load_rows):
+    index.load(load_rows(index.reload_after(), index.pending_ranges()))
+
+
+def test_also_bought_counts_orders_with_both_products():
+    index = recommendations.CoPurchaseIndex()
+    index.load([(1, "ALFKI", 1), (1, "ALFKI", 2), (2, "ANATR", 1), (2, "ANATR", 3), (3, "ALFKI", 1),
+                (3, "ALFKI", 2)])
+    assert index.also_bought(1) == [{"ProductID": 2, "Orders": 2, "Confidence": 0.6667},
+                                    {"ProductID": 3, "Orders": 1, "Confidence": 0.3333}]
+    assert index.also_bought(99) == []
+
+
+def test_pairs_from_late_committed_bulk_appear_after_refresh():
+    # /orders/bulk nhận OrderID 3..2002 lúc flush nhưng commit sau hóa đơn 2003
+    table = [(1, "ALFKI", 1), (1, "ALFKI", 2), (2, "ANATR", 1), (2, "ANATR", 2)]
+    index = recommendations.CoPurchaseIndex()
+    refresh(index, committed_loader(table))
+    table += [(2003, "ALFKI", 1), (2003, "ALFKI", 2)]
+    refresh(index, committed_loader(table))
+    assert index.also_bought(1) == [{"ProductID": 2, "Orders": 3, "Confidence": 1.0}]
+
+    table += [row for order_id in range(3, 2003) for row in ((order_id, "BERGS", 1), (order_id, "BERGS", 5))]
+    refresh(index, committed_loader(table))
+    assert index.also_bought(1) == [{"ProductID": 5, "Orders": 2000, "Confidence": 0.9985},
+                                    {"ProductID": 2, "Orders": 3, "Confidence": 0.0015}]
+    assert index.orders == 2003
+    refresh(index, committed_loader(table))
+    assert index.orders == 2003
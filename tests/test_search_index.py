@@ -0,0 +1,55 @@
+from main import crud
+from main.search_index import ProductIndexHolder, ProductSearchIndex
+
+PRODUCTS = [(1, "Chai"), (2, "Chang"), (3, "Aniseed Syrup"), (4, "Chai Tea Latte"), (5, "Spiced Chai"),
+            (6, "Grandma's Boysenberry Spread"), (7, "Chaiwala Mix")]
+
+
+def test_search_ranks_exact_then_prefix_then_word_then_substring():
+    index = ProductSearchIndex(PRODUCTS)
+    # trùng khớp, tiền tố tên (tên ngắn trước), tiền tố một từ, chuỗi con
+    assert index.search("chai") == [1, 7, 4, 5]
+    assert index.search("CHAI  tea") == [4]
+    assert index.search("seed") == [3]
+    assert index.search("xyz") == []
+    assert index.search("chai", limit=2) == [1, 7]
+    assert index.search("tea") == [4]
+
+
+def test_short_terms_fall_back_to_substring():
+    # Dưới 3 ký tự không có trigram: tiền tố trước, rồi chuỗi con như ILIKE '%ai%'
+    index = ProductSearchIndex(PRODUCTS)
+    assert index.search("ai") == [1, 5, 7, 4]
+    assert index.search("sp") == [5, 6]
+    assert index.search("s", limit=2) == [5, 3]
+
+
+def test_autocomplete_prefers_name_prefix():
+    index = ProductSearchIndex(PRODUCTS)
+    assert [item["ProductID"] for item in index.autocomplete("cha")] == [1, 4, 7, 2, 5]
+
+
+def test_holder_rebuilds_when_version_changes():
+    holder, loads = ProductIndexHolder(), []
+
+    def load_rows():
+        loads.append(1)
+        return PRODUCTS
+
+    first = holder.build(load_rows, (1, None))
+    assert holder.build(load_rows, (1, None)) is first
+    assert holder.build(load_rows, (2, None)) is not first
+    assert len(loads) == 2
+
+
+def test_search_etag_follows_product_names_version(client, db):
+    first = client.get("/products/search", params={"product_name": "chai"})
+    assert first.status_code == 200
+    assert client.get("/products/search", params={"product_name": "chai"}).headers["ETag"] == first.headers["ETag"]
+
+    crud.bump_table_versions(db, "product_names")
+    db.commit()
+    again = client.get("/products/search", params={"product_name": "chai"},
+                       headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 200
+    assert again.headers["ETag"] != first.headers["ETag"]
@@ -0,0 +1,54 @@
+import asyncio
+
+from main.cache import ResultCache
+from main.single_flight import SingleFlight, cached
+
+
+def test_concurrent_misses_share_one_query():
+    cache, flight = ResultCache(), SingleFlight("test-shared")
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "rows"
+
+    async def scenario():
+        return await asyncio.gather(*[cached(cache, flight, ("revenue", "daily"), compute, tags=("revenue",))
+                                      for _ in range(10)])
+
+    assert asyncio.run(scenario()) == ["rows"] * 10
+    assert calls == 1
+    assert flight.coalesced == 9
+
+
+def test_request_after_invalidate_does_not_join_older_query():
+    # Leader bắt đầu truy vấn, lệnh ghi commit và invalidate, rồi follower đến: follower phải chạy truy vấn mới
+    # và kết quả cũ của leader không được vào cache
+    cache, flight = ResultCache(), SingleFlight("test-invalidate")
+    table = {"revenue": "old"}
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def compute():
+        value = table["revenue"]
+        started.set()
+        await release.wait()
+        return value
+
+    async def read():
+        return await cached(cache, flight, ("revenue", "daily"), compute, tags=("revenue",))
+
+    async def scenario():
+        leader = asyncio.create_task(read())
+        await started.wait()
+        table["revenue"] = "new"
+        cache.invalidate("revenue")
+        follower = asyncio.create_task(read())
+        await asyncio.sleep(0)
+        release.set()
+        return await leader, await follower, await read()
+
+    assert asyncio.run(scenario()) == ("old", "new", "new")
+    assert flight.leaders == 2
+    assert flight.coalesced == 0